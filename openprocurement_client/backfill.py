@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import heapq
+import logging
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+from iso8601 import UTC, parse_date
+
+from .client import TendersClient
+from .pool import ConnectionPool
+from .sync import _feed_params
+from .tracker import _timestamp
+
+logger = logging.getLogger(__name__)
+
+
+def split_windows(start, end=None, count=4):
+    """Split [start, end) into ``count`` equal dateModified windows.
+
+    crawl_window lists the items changed at a window's start in that
+    window and those changed at its end in the next one.
+    """
+    start = parse_date(start)
+    end = parse_date(end) if end else datetime.now(UTC)
+    step = (end - start) / count
+    bounds = [start + step * i for i in range(count)] + [end]
+    return [(bounds[i].isoformat(), bounds[i + 1].isoformat())
+            for i in range(count)]
+
+
+def crawl_window(client, window, params=None):
+    """Return items changed within ``window``, ordered by dateModified.
+
+    Walks the dateModified feed from the window start with the client's
+    params (mode, opt_fields) but its own cursor, so the client's cursor
+    is left alone.
+    """
+    start, end = window
+    end_timestamp = _timestamp(end)
+    params = _feed_params(client, params, 'dateModified')
+    # The feed lists items changed after offset, start a tick earlier
+    # so that the items changed at start itself are listed too.
+    params['offset'] = (parse_date(start) - timedelta(microseconds=1)).isoformat()
+    items = []
+    while True:
+        page = client._get_resource_page(params)
+        for item in page['data']:
+            if _timestamp(item['dateModified']) >= end_timestamp:
+                return items
+            items.append(item)
+        if not page['data']:
+            return items
+        params['offset'] = page['next_page']['offset']
+
+
+def _crawl(args):
+    client_class, client_kwargs, window, params = args
+    # A forked worker inherits the parent's pools along with their open
+    # sockets, which every worker would then talk over at once.
+    client_kwargs = dict(client_kwargs)
+    client_kwargs.setdefault('pool', ConnectionPool())
+    client = client_class(**client_kwargs)
+    items = crawl_window(client, window, params)
+    logger.info("Got {} items from {} - {}".format(len(items), *window))
+    return items
+
+
+def merge_windows(windows):
+    """Merge per window results into one list ordered by dateModified.
+
+    An id seen in several windows is kept once, at its latest change.
+    """
+    keyed = [[(_timestamp(item['dateModified']), number, position, item)
+              for position, item in enumerate(items)]
+             for number, items in enumerate(windows)]
+    latest = {}
+    for items in keyed:
+        for timestamp, _, _, item in items:
+            if timestamp >= latest.get(item['id'], timestamp):
+                latest[item['id']] = timestamp
+    merged = []
+    for timestamp, _, _, item in heapq.merge(*keyed):
+        if latest.get(item['id']) == timestamp:
+            del latest[item['id']]
+            merged.append(item)
+    return merged
+
+
+def sharded_backfill(start, end=None, processes=4, client_class=TendersClient,
+                     params=None, **client_kwargs):
+    """Crawl [start, end) in ``processes`` time windows in parallel.
+
+    Every worker process builds its own ``client_class(**client_kwargs)``
+    and walks one window, so JSON decoding runs on as many cores.
+    Call it from a process that is not monkey patched by gevent,
+    multiprocessing does not work on top of the patched threading.
+    """
+    windows = split_windows(start, end, processes)
+    pool = Pool(processes)
+    try:
+        results = pool.map(_crawl, [(client_class, client_kwargs, window, params)
+                                    for window in windows])
+    finally:
+        pool.close()
+        pool.join()
+    return merge_windows(results)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import deque
+from time import time
+
+from restkit.errors import ResourceError
+
+from .exceptions import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def is_failure(error):
+    """Whether error says the API is in trouble rather than the request"""
+    if isinstance(error, ResourceError):
+        return error.status_int is None or error.status_int >= 500 or error.status_int == 429
+    return True
+
+
+class CircuitBreaker(object):
+    """Fail fast on one endpoint family while the API is failing there.
+
+    Keeps the outcome of the last ``window`` calls and opens once at
+    least ``min_calls`` of them are in and ``error_rate`` of them failed
+    or ``slow_rate`` of them took over ``slow_call`` seconds. While open,
+    calls raise CircuitOpen without touching the network. After
+    ``reset_timeout`` seconds up to ``half_open_calls`` trial calls go
+    through: the breaker closes when they all succeed, and opens again
+    on the first failure.
+    """
+
+    def __init__(self, name, window=20, min_calls=10, error_rate=0.5,
+                 slow_call=None, slow_rate=0.5, reset_timeout=30.,
+                 half_open_calls=1):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self.opened_at = None
+        self.calls = deque(maxlen=window)
+        self._trials = 0
+        self._trial_successes = 0
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go out now"""
+        if self.state == OPEN:
+            if time() - self.opened_at < self.reset_timeout:
+                raise CircuitOpen(self.name)
+            self.state = HALF_OPEN
+            self._trials = 0
+            self._trial_successes = 0
+            logger.info("Circuit {} half-open".format(self.name))
+        if self.state == HALF_OPEN:
+            if self._trials >= self.half_open_calls:
+                raise CircuitOpen(self.name)
+            self._trials += 1
+
+    def record(self, failed, duration):
+        slow = self.slow_call is not None and duration > self.slow_call
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                self._open()
+            else:
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_calls:
+                    self.state = CLOSED
+                    self.calls.clear()
+                    logger.info("Circuit {} closed".format(self.name))
+            return
+        self.calls.append((failed, slow))
+        if self.state == CLOSED and len(self.calls) >= self.min_calls:
+            failures = sum(1 for failed, _ in self.calls if failed)
+            slow_calls = sum(1 for _, slow in self.calls if slow)
+            if (failures >= self.error_rate * len(self.calls) or
+                    slow_calls >= self.slow_rate * len(self.calls)):
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time()
+        self.calls.clear()
+        logger.warning("Circuit {} open".format(self.name))
+
+
+class CircuitBreakers(object):
+    """One CircuitBreaker per endpoint family, shared by the clients given it.
+
+    Families are the client's resource (tenders, plans, contracts),
+    documents for document paths and edr for EDR verification. Options
+    are passed to every CircuitBreaker.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self.breakers = {}
+
+    def get(self, name):
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(name, **self.options)
+        return self.breakers[name]
+
+    def call(self, name, func, *args, **kwargs):
+        """Run func through the breaker of name"""
+        breaker = self.get(name)
+        breaker.before_call()
+        started = time()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            # A call cut short by gevent.Timeout or a kill is a failure
+            # too, else a half-open breaker would wait for it forever.
+            breaker.record(is_failure(e), time() - started)
+            raise
+        breaker.record(False, time() - started)
+        return result
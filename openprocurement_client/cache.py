@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import OrderedDict
+from time import time
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(object):
+    __slots__ = ('body', 'etag', 'last_modified', 'expires')
+
+    def __init__(self, body, etag=None, last_modified=None, expires=0):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def fresh(self):
+        return time() < self.expires
+
+    def validators(self):
+        """Conditional request headers that revalidate this entry"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """Bodies of GET responses kept with the validators they came with.
+
+    A client given one as ``cache`` sends the stored ETag and
+    Last-Modified back as If-None-Match/If-Modified-Since and, when the
+    server answers 304, decodes the stored body instead of downloading
+    it again.
+
+    With ``ttl`` set, entries younger than ``ttl`` seconds are served
+    without asking the server at all, whether they have validators or
+    not. ``max_size`` (entries) and ``max_bytes`` (body bytes) bound the
+    cache, evicting the least recently used entries first. Any write
+    the client makes to an object drops the entries of that object and
+    its subresources.
+    """
+
+    def __init__(self, max_size=None, max_bytes=None, ttl=None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.entries[key] = entry
+        return entry
+
+    def set(self, key, body, headers):
+        self.discard(key)
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not (etag or last_modified or self.ttl):
+            return
+        if self.max_bytes is not None and len(body) > self.max_bytes:
+            return
+        self.entries[key] = CacheEntry(body, etag, last_modified, self._expires())
+        self.size_bytes += len(body)
+        while ((self.max_size is not None and len(self.entries) > self.max_size) or
+               (self.max_bytes is not None and self.size_bytes > self.max_bytes)):
+            _, entry = self.entries.popitem(last=False)
+            self.size_bytes -= len(entry.body)
+            self.evictions += 1
+
+    def renew(self, entry):
+        """Restart the TTL of an entry the server confirmed unchanged"""
+        entry.expires = self._expires()
+
+    def _expires(self):
+        return time() + self.ttl if self.ttl else 0
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry.body)
+
+    def invalidate(self, path):
+        """Drop the entries of ``path`` and of everything below it"""
+        prefix = path + '/'
+        for key in [key for key in self.entries
+                    if key[0] == path or key[0].startswith(prefix)]:
+            self.discard(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.size_bytes = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.size_bytes,
+        }
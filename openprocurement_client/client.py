@@ -1,25 +1,37 @@
 import logging
 from functools import wraps
 from io import FileIO
-from os import path
-from urlparse import parse_qs, urlparse
+from hashlib import md5
+from os import path, remove
+from time import time
+from urlparse import parse_qs, urljoin, urlparse
 
-from iso8601 import parse_date
+from gevent import sleep
+from gevent.event import AsyncResult
+from gevent.pool import Pool
 
-from munch import munchify
-
-from restkit import BasicAuth, Resource, request
-from restkit.errors import ResourceNotFound
-
-from retrying import retry
-
-from simplejson import dumps, loads
+from restkit import BasicAuth, Resource
+from restkit.client import Client as HTTPClient
+from restkit.errors import RequestFailed, ResourceNotFound
 
+from .codec import get_codec
 from .exceptions import InvalidResponse, NoToken
+from .lazy import lazy_munchify
+from .paths import (access_headers, api_path, get_access_token, item_path,
+                    latest_params)
+from .pool import get_default_pool
+from .retry import RetryPolicy, _retry_after
+from .session import CookieJar
+from .stream import PageStream
+from .sync import expand_items
+from .upload import MultipartBody
 
 logger = logging.getLogger(__name__)
 
 IGNORE_PARAMS = ('uri', 'path')
+RESPONSE_FORMATS = ('munch', 'dict', 'raw')
+# Result of a single-flight GET whose leader gave up without a response.
+_ABANDONED = object()
 
 
 def verify_file(fn):
@@ -53,45 +65,145 @@ def verify_file(fn):
     return wrapper
 
 
+def _attachment_filename(response):
+    return response.headers['Content-Disposition'] \
+        .split("; filename=")[1].strip('"')
+
+
 class APIBaseClient(Resource):
     """base class for API"""
+
     def __init__(self, key,
                  host_url,
                  api_version,
                  resource,
                  params=None,
+                 codec=None,
+                 response_format='munch',
+                 cache=None,
+                 single_flight=False,
+                 cookies=None,
+                 retry_policy=None,
+                 breakers=None,
+                 rate_limiter=None,
                  **kwargs):
+        if kwargs.get('pool') is None and get_default_pool() is not None:
+            kwargs['pool'] = get_default_pool()
         super(APIBaseClient, self).__init__(
             host_url,
             filters=[BasicAuth(key, "")],
             **kwargs
         )
-        self.prefix_path = '/api/{}/{}'.format(api_version, resource)
+        self.codec = codec or get_codec()
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError('response_format must be one of {}'.format(
+                ', '.join(RESPONSE_FORMATS)))
+        # 'munch' wraps responses for attribute access, 'dict' returns
+        # them as decoded and 'raw' returns the body string undecoded.
+        self.response_format = response_format
+        # A ResponseCache revalidates single-object GETs, see _get_cached_resource_item.
+        self.cache = cache
+        # With single_flight, concurrent GETs of the same url and headers
+        # share one request and the one object decoded from it.
+        self.single_flight = single_flight
+        self._in_flight = {}
+        self.prefix_path = api_path(api_version, resource)
         if not isinstance(params, dict):
             params = {"mode": "_all_"}
         self.params = params
         self.headers = {"Content-Type": "application/json"}
-        # To perform some operations (e.g. create a tender)
-        # we first need to obtain a cookie. For that reason,
-        # here we send a HEAD request to a neutral URL.
-        self.head('/api/{}/spore'.format(api_version))
+        # Pass the same CookieJar to clients that should share a session.
+        self.cookies = cookies if cookies is not None else CookieJar()
+        self.spore_path = api_path(api_version, 'spore')
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # CircuitBreakers, shared by clients that should fail fast together.
+        self.breakers = breakers
+        # RateLimiter, shared by clients that should stay within one budget.
+        self.rate_limiter = rate_limiter
+        self.resource = resource
 
     def request(self, method, path=None, payload=None, headers=None,
                 params_dict=None, **params):
+        # A SessionPool picks the session by object id, so every request
+        # about one object carries the same cookie.
+        cookies = self.cookies.jar(self._object_id(path) or path or '')
+        if method not in ('GET', 'HEAD') and not cookies.bootstrapped \
+                and not cookies.header():
+            # To perform some operations (e.g. create a tender)
+            # we first need to obtain a cookie. For that reason,
+            # here we send a HEAD request to a neutral URL.
+            self._bootstrap(cookies)
+            cookies.bootstrapped = True
         _headers = dict(self.headers)
+        cookie = cookies.header()
+        if cookie:
+            _headers['Cookie'] = cookie
         _headers.update(headers or {})
         try:
-            response = super(APIBaseClient, self).request(
+            response = self._request_with_retries(
                 method, path=path, payload=payload, headers=_headers,
                 params_dict=params_dict, **params
             )
             if 'Set-Cookie' in response.headers:
-                self.headers['Cookie'] = response.headers['Set-Cookie']
+                cookies.update(response.headers['Set-Cookie'])
+            if response.status_int == 201 and 'Location' in response.headers:
+                # Keep reading a new object through the session that created it.
+                created = self._object_id(urlparse(response.headers['Location']).path)
+                if created and created != self._object_id(path):
+                    self.cookies.pin(created, cookies)
             return response
         except ResourceNotFound as e:
             if 'Set-Cookie' in e.response.headers:
-                self.headers['Cookie'] = e.response.headers['Set-Cookie']
+                cookies.update(e.response.headers['Set-Cookie'])
             raise e
+        finally:
+            if self.cache is not None and method not in ('GET', 'HEAD'):
+                self._invalidate(path)
+
+    def _request_with_retries(self, method, **kwargs):
+        """Send the request, resending it as self.retry_policy allows"""
+        family = self._family(kwargs.get('path'))
+        started = time()
+        attempt = 1
+        while True:
+            try:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.wait(family)
+                if self.breakers is None:
+                    return super(APIBaseClient, self).request(method, **kwargs)
+                return self.breakers.call(family, super(APIBaseClient, self).request,
+                                          method, **kwargs)
+            except Exception as e:
+                if self.rate_limiter is not None and getattr(e, 'status_int', None) == 429:
+                    self.rate_limiter.throttled(family, _retry_after(e))
+                delay = self.retry_policy.next_delay(method, e, attempt, started)
+                if delay is None:
+                    raise e
+            sleep(delay)
+            attempt += 1
+
+    def _family(self, path):
+        """Circuit breaker and rate limit family of requests to path"""
+        if path and '/documents' in path:
+            return 'documents'
+        return self.resource
+
+    def _bootstrap(self, cookies):
+        response = super(APIBaseClient, self).request('HEAD', path=self.spore_path,
+                                                      headers=self.headers)
+        if 'Set-Cookie' in response.headers:
+            cookies.update(response.headers['Set-Cookie'])
+
+    def _object_id(self, path):
+        """Id of the object path belongs to, None for other paths"""
+        if path and path.startswith(self.prefix_path + '/'):
+            return path[len(self.prefix_path) + 1:].split('/')[0]
+
+    def _invalidate(self, path):
+        """Drop cached responses of the object a write to path changes"""
+        object_id = self._object_id(path)
+        if object_id:
+            self.cache.invalidate(item_path(self.prefix_path, object_id))
 
     def patch(self, path=None, payload=None, headers=None,
               params_dict=None, **params):
@@ -116,52 +228,210 @@ class APIBaseClient(Resource):
         """
         return self.request("DELETE", path=path, headers=headers)
 
+    def _wrap(self, data):
+        if self.response_format == 'munch':
+            return lazy_munchify(data)
+        return data
+
+    def _decode(self, response):
+        """Return the response body in the client's response_format"""
+        return self._decode_body(response.body_string())
+
+    def _decode_body(self, body):
+        if self.response_format == 'raw':
+            return body
+        return self._wrap(self.codec.loads(body))
+
+    def _decode_list(self, response):
+        """Return the data of a list page, moving self.params to next_page.
+
+        The page has to be decoded for its offset anyway, so the 'raw'
+        format gets plain dicts here.
+        """
+        page = self.codec.loads(response.body_string())
+        self._update_params(page['next_page'])
+        return self._wrap(page['data'])
+
     def _update_params(self, params):
         for key in params:
             if key not in IGNORE_PARAMS:
                 self.params[key] = params[key]
 
+    def _get_resource_page(self, params):
+        """Fetch one page of the resource list without moving self.params"""
+        response = self.get(self.prefix_path, params_dict=params)
+        if response.status_int == 200:
+            return self._wrap(self.codec.loads(response.body_string()))
+        raise InvalidResponse
+
+    def _get_resource_list(self, stream=False):
+        """Get the list page at self.params, moving them to the next page.
+
+        A 404 means the offset is no longer valid for the feed, the list
+        is then read again once, from its start.
+        """
+        try:
+            return self._get_resource_list_page(stream)
+        except ResourceNotFound:
+            self.params.pop('offset', None)
+        return self._get_resource_list_page(stream)
+
+    def _get_resource_list_page(self, stream):
+        if stream:
+            return self._stream_resource_list()
+        response = self.get(self.prefix_path, params_dict=self.params)
+        if response.status_int == 200:
+            return self._decode_list(response)
+        raise InvalidResponse
+
+    def _stream_resource_list(self):
+        """Start reading the next list page, see _iter_page_stream"""
+        response = self.get(self.prefix_path, params_dict=self.params)
+        if response.status_int == 200:
+            return self._iter_page_stream(PageStream(response.body_stream()))
+        raise InvalidResponse
+
+    def _iter_page_stream(self, page):
+        """Yield list items as they are decoded from the response body.
+
+        self.params moves to the page's next_page only once the page is
+        read to the end.
+        """
+        try:
+            for item in page:
+                yield self._wrap(item)
+        finally:
+            page.body.close()
+        self._update_params(page.fields['next_page'])
+
     def _create_resource_item(self, url, payload, headers={}):
         headers.update(self.headers)
         response_item = self.post(
-            url, headers=headers, payload=dumps(payload)
+            url, headers=headers, payload=self.codec.dumps(payload)
         )
         if response_item.status_int == 201:
-            return munchify(loads(response_item.body_string()))
+            return self._decode(response_item)
         raise InvalidResponse
 
     def _get_resource_item(self, url, headers={}):
         headers.update(self.headers)
+        if self.single_flight:
+            return self._get_single_flight(url, headers)
+        return self._fetch_resource_item(url, headers)
+
+    def _get_single_flight(self, url, headers):
+        """Join the GET already in flight for url and headers, if any"""
+        key = (url, tuple(sorted(headers.items())))
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            result = flight.get()
+            if result is _ABANDONED:
+                # The leader was killed or timed out, fetch it ourselves.
+                return self._get_single_flight(url, headers)
+            return result
+        flight = self._in_flight[key] = AsyncResult()
+        try:
+            result = self._fetch_resource_item(url, headers)
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set(result)
+            return result
+        finally:
+            del self._in_flight[key]
+            if not flight.ready():
+                flight.set(_ABANDONED)
+
+    def _fetch_resource_item(self, url, headers):
+        if self.cache is not None:
+            return self._get_cached_resource_item(url, headers)
         response_item = self.get(url, headers=headers)
         if response_item.status_int == 200:
-            return munchify(loads(response_item.body_string()))
+            return self._decode(response_item)
+        raise InvalidResponse
+
+    def _get_cached_resource_item(self, url, headers):
+        """GET url through the cache.
+
+        Fresh entries are served as is, stale ones are revalidated and
+        served again on a 304. Entries are keyed by url and access token,
+        as the token decides what the server shows. The body is decoded
+        on every call so the caller never shares an object with the cache.
+        """
+        key = (url, headers.get('X-Access-Token', ''))
+        entry = self.cache.get(key)
+        if entry is not None and entry.fresh():
+            self.cache.hits += 1
+            return self._decode_body(entry.body)
+        request_headers = dict(headers)
+        if entry is not None:
+            request_headers.update(entry.validators())
+        response_item = self.get(url, headers=request_headers)
+        if response_item.status_int == 304 and entry is not None:
+            response_item.body_string()
+            self.cache.revalidated += 1
+            self.cache.renew(entry)
+            return self._decode_body(entry.body)
+        if response_item.status_int == 200:
+            self.cache.misses += 1
+            body = response_item.body_string()
+            self.cache.set(key, body, response_item.headers)
+            return self._decode_body(body)
         raise InvalidResponse
 
+    def _get_resource_items(self, ids, concurrency=10):
+        """Yield ``(id, object)`` pairs as concurrent GETs of ``ids`` finish.
+
+        A failed GET yields the exception in place of the object.
+        """
+        items = ({'id': item_id} for item_id in ids)
+        for item, result in expand_items(self, items, concurrency=concurrency):
+            yield item['id'], result
+
     def _patch_resource_item(self, url, payload, headers={}):
         headers.update(self.headers)
         response_item = self.patch(
-            url, headers=headers, payload=dumps(payload)
+            url, headers=headers, payload=self.codec.dumps(payload)
         )
         if response_item.status_int == 200:
-            return munchify(loads(response_item.body_string()))
+            return self._decode(response_item)
         raise InvalidResponse
 
-    def _upload_resource_file(self, url, data, headers={}, method='post'):
+    def _upload_resource_file(self, url, data, headers={}, method='post',
+                              progress=None):
         file_headers = {}
         file_headers.update(self.headers)
         file_headers.update(headers)
         file_headers['Content-Type'] = "multipart/form-data"
         response_item = getattr(self, method)(
-            url, headers=file_headers, payload=data
+            url, headers=file_headers,
+            payload=MultipartBody(data, progress=progress)
         )
         if response_item.status_int in (201, 200):
-            return munchify(loads(response_item.body_string()))
+            return self._decode(response_item)
         raise InvalidResponse
 
+    def _upload_files(self, upload, files, concurrency=5):
+        """Call upload(file_) for every file on a pool of greenlets.
+
+        Returns a list in the order of files holding the created document,
+        or the exception for a file that failed. Each upload is resent
+        only as self.retry_policy allows, like any other request.
+        """
+        def attempt(file_):
+            try:
+                return upload(file_)
+            except Exception as e:
+                logger.warning("Can't upload file {}: {}".format(getattr(file_, 'name', file_), e))
+                return e
+
+        return list(Pool(concurrency).imap(attempt, files))
+
     def _delete_resource_item(self, url, headers={}):
         response_item = self.delete(url, headers=headers)
         if response_item.status_int == 200:
-            return munchify(loads(response_item.body_string()))
+            return self._decode(response_item)
         raise InvalidResponse
 
 
@@ -172,54 +442,31 @@ class TendersClient(APIBaseClient):
                  host_url="https://api-sandbox.openprocurement.org",
                  api_version='2.0',
                  params=None,
-                 resource='tenders'):
-        super(TendersClient, self).__init__(key, host_url, api_version, resource, params)
+                 resource='tenders',
+                 **kwargs):
+        super(TendersClient, self).__init__(key, host_url, api_version, resource, params,
+                                            **kwargs)
 
     ###########################################################################
     #             GET ITEMS LIST API METHODS
     ###########################################################################
 
-    @retry(stop_max_attempt_number=5)
-    def get_tenders(self, params={}, feed='changes'):
+    def get_tenders(self, params={}, feed='changes', stream=False):
         params['feed'] = feed
-        try:
-            self._update_params(params)
-            response = self.get(
-                self.prefix_path,
-                params_dict=self.params)
-            if response.status_int == 200:
-                tender_list = munchify(loads(response.body_string()))
-                self._update_params(tender_list.next_page)
-                return tender_list.data
-
-        except ResourceNotFound:
-            del self.params['offset']
-            raise
-
-        raise InvalidResponse
+        self._update_params(params)
+        return self._get_resource_list(stream)
 
     def get_latest_tenders(self, date, tender_id):
-        iso_dt = parse_date(date)
-        dt = iso_dt.strftime("%Y-%m-%d")
-        tm = iso_dt.strftime("%H:%M:%S")
-        response = self._get_resource_item(
-            '{}?offset={}T{}&opt_fields=tender_id&mode=test'.format(
-                self.prefix_path,
-                dt,
-                tm
-            )
-        )
+        response = self.get(self.prefix_path,
+                            params_dict=latest_params(date, 'tender_id'))
         if response.status_int == 200:
-            tender_list = munchify(loads(response.body_string()))
-            self._update_params(tender_list.next_page)
-            return tender_list.data
+            return self._decode_list(response)
         raise InvalidResponse
 
     def _get_tender_resource_list(self, tender, items_name):
         return self._get_resource_item(
-            '{}/{}/{}'.format(self.prefix_path, tender.data.id, items_name),
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            item_path(self.prefix_path, tender.data.id, items_name),
+            headers=access_headers(tender)
         )
 
     def get_questions(self, tender, params={}):
@@ -230,16 +477,15 @@ class TendersClient(APIBaseClient):
 
     def get_awards_documents(self, tender, award_id, params={}):
         return self._get_resource_item(
-            '{}/{}/awards/{}/documents'.format(self.prefix_path, tender.data.id, award_id),
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            item_path(self.prefix_path, tender.data.id, "awards", award_id, "documents"),
+            headers=access_headers(tender)
         )
 
     def get_qualification_documents(self, tender, qualification_id, params={}):
         return self._get_resource_item(
-            '{}/{}/qualifications/{}/documents'.format(self.prefix_path, tender.data.id, qualification_id),
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            item_path(self.prefix_path, tender.data.id,
+                      "qualifications", qualification_id, "documents"),
+            headers=access_headers(tender)
         )
 
     def get_awards(self, tender, params={}):
@@ -254,10 +500,9 @@ class TendersClient(APIBaseClient):
 
     def _create_tender_resource_item(self, tender, item_obj, items_name):
         return self._create_resource_item(
-            '{}/{}/{}'.format(self.prefix_path, tender.data.id, items_name),
+            item_path(self.prefix_path, tender.data.id, items_name),
             item_obj,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def create_tender(self, tender):
@@ -283,21 +528,16 @@ class TendersClient(APIBaseClient):
 
     def create_award_complaint(self, tender, complaint, award_id):
         return self._create_resource_item(
-            '{}/{}/{}'.format(self.prefix_path, tender.data.id, "awards/{0}/complaints".format(award_id)),
+            item_path(self.prefix_path, tender.data.id, "awards", award_id, "complaints"),
             complaint,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def create_thin_document(self, tender, document_data):
         return self._create_resource_item(
-            '{}/{}/documents'.format(
-                self.prefix_path,
-                tender.data.id
-            ),
+            item_path(self.prefix_path, tender.data.id, "documents"),
             document_data,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     ###########################################################################
@@ -305,21 +545,16 @@ class TendersClient(APIBaseClient):
     ###########################################################################
 
     def get_tender(self, id):
-        return self._get_resource_item('{}/{}'.format(self.prefix_path, id))
+        return self._get_resource_item(item_path(self.prefix_path, id))
+
+    def get_tenders_bulk(self, ids, concurrency=10):
+        return self._get_resource_items(ids, concurrency)
 
     def _get_tender_resource_item(self, tender, item_id, items_name,
                                   access_token=""):
-        if access_token:
-            headers = {'X-Access-Token': access_token}
-        else:
-            headers = {'X-Access-Token':
-                       getattr(getattr(tender, 'access', ''), 'token', '')}
         return self._get_resource_item(
-            '{}/{}/{}/{}'.format(self.prefix_path,
-                                 tender.data.id,
-                                 items_name,
-                                 item_id),
-            headers=headers
+            item_path(self.prefix_path, tender.data.id, items_name, item_id),
+            headers=access_headers(tender, access_token)
         )
 
     def get_question(self, tender, question_id):
@@ -332,7 +567,12 @@ class TendersClient(APIBaseClient):
     def get_lot(self, tender, lot_id):
         return self._get_tender_resource_item(tender, lot_id, "lots")
 
-    def get_file(self, tender, url, access_token=None):
+    def _open_file(self, url, access_token=None):
+        """Follow the document url to its storage, return the response.
+
+        The redirect is followed without the API credentials, over a
+        connection from this client's pool.
+        """
         parsed_url = urlparse(url)
         headers = {}
         if access_token:
@@ -344,15 +584,55 @@ class TendersClient(APIBaseClient):
                                  params_dict=parse_qs(parsed_url.query))
 
         if response_item.status_int == 302:
-            response_obj = request(response_item.headers['location'])
+            location = urljoin(url, response_item.headers['location'])
+            response_item.body_string()
+            client = HTTPClient(pool=self.client._pool, timeout=self.client.timeout)
+            if self.breakers is None:
+                response_obj = client.request(location)
+            else:
+                response_obj = self.breakers.call('documents', client.request, location)
             if response_obj.status_int == 200:
-                return response_obj.body_string(), \
-                    response_obj.headers['Content-Disposition'] \
-                    .split("; filename=")[1].strip('"')
+                return response_obj
+            response_obj.body_string()
         raise InvalidResponse
 
+    def get_file(self, tender, url, access_token=None):
+        response_obj = self._open_file(url, access_token)
+        return response_obj.body_string(), _attachment_filename(response_obj)
+
+    def download_file(self, url, file_, access_token=None, chunk_size=64 * 1024):
+        """Stream the document at url into file_, a path or a writable file.
+
+        The body is read and written chunk_size bytes at a time. Returns
+        (filename, size, hash) of the document, with hash in the
+        'md5:<hex>' form the API uses for documents.
+        """
+        response_obj = self._open_file(url, access_token)
+        body = response_obj.body_stream()
+        checksum = md5()
+        size = 0
+        output = open(file_, 'wb') if isinstance(file_, basestring) else file_
+        try:
+            chunk = body.read(chunk_size)
+            while chunk:
+                output.write(chunk)
+                checksum.update(chunk)
+                size += len(chunk)
+                chunk = body.read(chunk_size)
+        except Exception:
+            if output is not file_:
+                output.close()
+                remove(file_)
+            raise
+        finally:
+            body.close()
+        if output is not file_:
+            output.close()
+        return (_attachment_filename(response_obj), size,
+                'md5:{}'.format(checksum.hexdigest()))
+
     def extract_credentials(self, id):
-        return self._get_resource_item('{}/{}/extract_credentials'.format(self.prefix_path, id))
+        return self._get_resource_item(item_path(self.prefix_path, id, "extract_credentials"))
 
     ###########################################################################
     #             PATCH ITEM API METHODS
@@ -360,20 +640,17 @@ class TendersClient(APIBaseClient):
 
     def _patch_tender_resource_item(self, tender, item_obj, items_name):
         return self._patch_resource_item(
-            '{}/{}/{}/{}'.format(
-                self.prefix_path, tender.data.id, items_name, item_obj['data']['id']
-            ),
+            item_path(self.prefix_path, tender.data.id, items_name,
+                      item_obj['data']['id']),
             payload=item_obj,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def patch_tender(self, tender):
         return self._patch_resource_item(
-            '{}/{}'.format(self.prefix_path, tender["data"]["id"]),
+            item_path(self.prefix_path, tender["data"]["id"]),
             payload=tender,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def patch_question(self, tender, question):
@@ -384,12 +661,9 @@ class TendersClient(APIBaseClient):
 
     def patch_bid_document(self, tender, document_data, bid_id, document_id):
         return self._patch_resource_item(
-            '{}/{}/{}/{}/documents/{}'.format(
-                self.prefix_path, tender.data.id, "bids", bid_id, document_id
-            ),
+            item_path(self.prefix_path, tender.data.id, "bids", bid_id, "documents", document_id),
             payload=document_data,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def patch_award(self, tender, award):
@@ -397,12 +671,10 @@ class TendersClient(APIBaseClient):
 
     def patch_award_document(self, tender, document_data, award_id, document_id):
         return self._patch_resource_item(
-            '{}/{}/{}/{}/documents/{}'.format(
-                self.prefix_path, tender.data.id, "awards", award_id, document_id
-            ),
+            item_path(self.prefix_path, tender.data.id,
+                      "awards", award_id, "documents", document_id),
             payload=document_data,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def patch_cancellation(self, tender, cancellation):
@@ -410,12 +682,10 @@ class TendersClient(APIBaseClient):
 
     def patch_cancellation_document(self, tender, cancellation, cancellation_id, cancellation_doc_id):
         return self._patch_resource_item(
-            '{}/{}/{}/{}/documents/{}'.format(
-                self.prefix_path, tender.data.id, "cancellations", cancellation_id, cancellation_doc_id
-            ),
+            item_path(self.prefix_path, tender.data.id,
+                      "cancellations", cancellation_id, "documents", cancellation_doc_id),
             payload=cancellation,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def patch_complaint(self, tender, complaint):
@@ -423,12 +693,10 @@ class TendersClient(APIBaseClient):
 
     def patch_award_complaint(self, tender, complaint, award_id):
         return self._patch_resource_item(
-            '{}/{}/awards/{}/complaints/{}'.format(
-                self.prefix_path, tender.data.id, award_id, complaint.data.id
-            ),
+            item_path(self.prefix_path, tender.data.id,
+                      "awards", award_id, "complaints", complaint.data.id),
             payload=complaint,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def patch_lot(self, tender, lot):
@@ -445,16 +713,14 @@ class TendersClient(APIBaseClient):
 
     def patch_contract_document(self, tender, document_data, contract_id, document_id):
         return self._patch_resource_item(
-            '{}/{}/{}/{}/documents/{}'.format(
-                self.prefix_path, tender.data.id, "contracts", contract_id, document_id
-            ),
+            item_path(self.prefix_path, tender.data.id,
+                      "contracts", contract_id, "documents", document_id),
             payload=document_data,
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            headers=access_headers(tender)
         )
 
     def patch_credentials(self, id, access_token):
-        return self._patch_resource_item('{}/{}/credentials'.format(self.prefix_path, id),
+        return self._patch_resource_item(item_path(self.prefix_path, id, "credentials"),
                                          payload={},
                                          headers={'X-Access-Token': access_token})
 
@@ -463,141 +729,119 @@ class TendersClient(APIBaseClient):
     ###########################################################################
 
     @verify_file
-    def upload_document(self, file_, tender):
+    def upload_document(self, file_, tender, progress=None):
         return self._upload_resource_file(
-            '{}/{}/documents'.format(
-                self.prefix_path,
-                tender.data.id
-            ),
+            item_path(self.prefix_path, tender.data.id, "documents"),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(tender)
         )
 
     @verify_file
-    def upload_bid_document(self, file_, tender, bid_id, doc_type="documents"):
+    def upload_bid_document(self, file_, tender, bid_id, doc_type="documents", progress=None):
         return self._upload_resource_file(
-            '{}/{}/bids/{}/{}'.format(
-                self.prefix_path,
-                tender.data.id,
-                bid_id,
-                doc_type
-            ),
+            item_path(self.prefix_path, tender.data.id, "bids", bid_id, doc_type),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(tender)
         )
 
     @verify_file
-    def update_bid_document(self, file_, tender, bid_id, document_id, doc_type="documents"):
+    def update_bid_document(self, file_, tender, bid_id, document_id, doc_type="documents", progress=None):
         return self._upload_resource_file(
-            '{}/{}/bids/{}/{}/{}'.format(
-                self.prefix_path,
-                tender.data.id,
-                bid_id,
-                doc_type,
-                document_id
-            ),
+            item_path(self.prefix_path, tender.data.id, "bids", bid_id, doc_type, document_id),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')},
+            progress=progress,
+            headers=access_headers(tender),
             method='put'
         )
 
     @verify_file
-    def upload_cancellation_document(self, file_, tender, cancellation_id):
+    def upload_cancellation_document(self, file_, tender, cancellation_id, progress=None):
         return self._upload_resource_file(
-            '{}/{}/cancellations/{}/documents'.format(
-                self.prefix_path,
-                tender.data.id,
-                cancellation_id
-            ),
+            item_path(self.prefix_path, tender.data.id,
+                      "cancellations", cancellation_id, "documents"),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(tender)
         )
 
     @verify_file
-    def update_cancellation_document(self, file_, tender, cancellation_id, document_id):
+    def update_cancellation_document(self, file_, tender, cancellation_id, document_id, progress=None):
             return self._upload_resource_file(
-                '{}/{}/cancellations/{}/documents/{}'.format(
-                    self.prefix_path,
-                    tender.data.id,
-                    cancellation_id,
-                    document_id
-                ),
+                item_path(self.prefix_path, tender.data.id,
+                          "cancellations", cancellation_id, "documents", document_id),
                 data={"file": file_},
-                headers={'X-Access-Token':
-                         getattr(getattr(tender, 'access', ''), 'token', '')},
+                progress=progress,
+                headers=access_headers(tender),
                 method='put'
             )
 
     @verify_file
-    def upload_complaint_document(self, file_, tender, complaint_id):
+    def upload_complaint_document(self, file_, tender, complaint_id, progress=None):
         return self._upload_resource_file(
-            '{}/{}/complaints/{}/documents'.format(
-                self.prefix_path,
-                tender.data.id,
-                complaint_id),
+            item_path(self.prefix_path, tender.data.id, "complaints", complaint_id, "documents"),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(tender)
         )
 
     @verify_file
-    def upload_award_complaint_document(self, file_, tender, award_id, complaint_id):
+    def upload_award_complaint_document(self, file_, tender, award_id, complaint_id, progress=None):
         return self._upload_resource_file(
-            '{}/{}/awards/{}/complaints/{}/documents'.format(
-                self.prefix_path,
-                tender.data.id,
-                award_id,
-                complaint_id),
+            item_path(self.prefix_path, tender.data.id,
+                      "awards", award_id, "complaints", complaint_id, "documents"),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(tender)
         )
 
     @verify_file
-    def upload_qualification_document(self, file_, tender, qualification_id):
+    def upload_qualification_document(self, file_, tender, qualification_id, progress=None):
         return self._upload_resource_file(
-            '{}/{}/qualifications/{}/documents'.format(
-                self.prefix_path,
-                tender.data.id,
-                qualification_id
-            ),
+            item_path(self.prefix_path, tender.data.id,
+                      "qualifications", qualification_id, "documents"),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(tender)
         )
 
     @verify_file
-    def upload_award_document(self, file_, tender, award_id, doc_type="documents"):
+    def upload_award_document(self, file_, tender, award_id, doc_type="documents", progress=None):
         return self._upload_resource_file(
-            '{}/{}/awards/{}/{}'.format(
-                self.prefix_path,
-                tender.data.id,
-                award_id,
-                doc_type
-            ),
+            item_path(self.prefix_path, tender.data.id, "awards", award_id, doc_type),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(tender)
         )
 
     @verify_file
-    def upload_contract_document(self, file_, tender, contract_id, doc_type="documents"):
+    def upload_contract_document(self, file_, tender, contract_id, doc_type="documents", progress=None):
         return self._upload_resource_file(
-            '{}/{}/contracts/{}/documents'.format(
-                self.prefix_path,
-                tender.data.id,
-                contract_id,
-                doc_type
-            ),
+            item_path(self.prefix_path, tender.data.id, "contracts", contract_id, "documents"),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(tender)
         )
 
+    def upload_documents(self, tender, files, concurrency=5):
+        """Upload files to the tender concurrently, see _upload_files"""
+        return self._upload_files(
+            lambda file_: self.upload_document(file_, tender),
+            files, concurrency)
+
+    def upload_bid_documents(self, tender, bid_id, files, doc_type="documents",
+                             concurrency=5):
+        return self._upload_files(
+            lambda file_: self.upload_bid_document(file_, tender, bid_id, doc_type),
+            files, concurrency)
+
+    def upload_award_documents(self, tender, award_id, files, doc_type="documents",
+                               concurrency=5):
+        return self._upload_files(
+            lambda file_: self.upload_award_document(file_, tender, award_id, doc_type),
+            files, concurrency)
+
     ###########################################################################
     #             DELETE ITEMS LIST API METHODS
     ###########################################################################
@@ -609,13 +853,9 @@ class TendersClient(APIBaseClient):
             access_token = access_token
         else:
             bid_id = bid.data.id
-            access_token = getattr(getattr(bid, 'access', ''), 'token', '')
+            access_token = get_access_token(bid)
         return self._delete_resource_item(
-            '{}/{}/bids/{}'.format(
-                self.prefix_path,
-                tender.data.id,
-                bid_id
-            ),
+            item_path(self.prefix_path, tender.data.id, "bids", bid_id),
             headers={'X-Access-Token': access_token}
         )
 
@@ -626,13 +866,8 @@ class TendersClient(APIBaseClient):
         else:
             lot_id = lot.data.id
         return self._delete_resource_item(
-            '{}/{}/lots/{}'.format(
-                self.prefix_path,
-                tender.data.id,
-                lot_id
-            ),
-            headers={'X-Access-Token':
-                     getattr(getattr(tender, 'access', ''), 'token', '')}
+            item_path(self.prefix_path, tender.data.id, "lots", lot_id),
+            headers=access_headers(tender)
         )
     ###########################################################################
 
@@ -649,10 +884,8 @@ class TendersClientSync(TendersClient):
 
         response = self.get(self.prefix_path, params_dict=params)
         if response.status_int == 200:
-            tender_list = munchify(loads(response.body_string()))
-            return tender_list
+            return self._decode(response)
 
-    @retry(stop_max_attempt_number=5)
     def get_tender(self, id, extra_headers={}):
         self.headers.update(extra_headers)
         return super(TendersClientSync, self).get_tender(id)
@@ -661,22 +894,37 @@ class TendersClientSync(TendersClient):
 class EDRClient(Resource):
     """ Client for validate members by EDR """
 
-    def __init__(self, host_url, api_version, username, password, **kwargs):
-        prefix_path = '{}/api/{}'.format(host_url, api_version)
+    def __init__(self, host_url, api_version, username, password, codec=None,
+                 breakers=None, rate_limiter=None, **kwargs):
+        prefix_path = host_url + api_path(api_version)
+        if kwargs.get('pool') is None and get_default_pool() is not None:
+            kwargs['pool'] = get_default_pool()
         super(EDRClient, self).__init__(prefix_path,
                                         filters=[BasicAuth(username, password)],
                                         **kwargs)
+        self.codec = codec or get_codec()
+        self.breakers = breakers
+        self.rate_limiter = rate_limiter
         self.headers = {"Content-Type": "application/json"}
 
     def request(self, method, path=None, payload=None, headers=None,
                 params_dict=None, **params):
         _headers = dict(self.headers)
         _headers.update(headers or {})
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait('edr')
         try:
-            response = super(EDRClient, self).request(
-                method, path=path, payload=payload, headers=_headers,
-                params_dict=params_dict, **params
-            )
+            if self.breakers is None:
+                response = super(EDRClient, self).request(
+                    method, path=path, payload=payload, headers=_headers,
+                    params_dict=params_dict, **params
+                )
+            else:
+                response = self.breakers.call(
+                    'edr', super(EDRClient, self).request,
+                    method, path=path, payload=payload, headers=_headers,
+                    params_dict=params_dict, **params
+                )
             if 'Set-Cookie' in response.headers:
                 self.headers['Cookie'] = response.headers['Set-Cookie']
             return response
@@ -684,11 +932,15 @@ class EDRClient(Resource):
             if 'Set-Cookie' in e.response.headers:
                 self.headers['Cookie'] = e.response.headers['Set-Cookie']
             raise e
+        except RequestFailed as e:
+            if self.rate_limiter is not None and e.status_int == 429:
+                self.rate_limiter.throttled('edr', _retry_after(e))
+            raise e
 
     def verify_member(self, edrpou, headers=None):
         response = self.request("GET", "/verify",
                                 params_dict={'id': edrpou},
                                 headers=headers)
         if response.status_int == 200:
-            return munchify(loads(response.body_string()))
+            return lazy_munchify(self.codec.loads(response.body_string()))
         raise InvalidResponse
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fastest first, get_codec() picks the first one that imports.
+BACKENDS = ('orjson', 'ujson', 'simplejson', 'json')
+
+
+class JSONCodec(object):
+    """JSON dumps/loads pair of one backend"""
+
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return '<JSONCodec {}>'.format(self.name)
+
+
+def _load_backend(name):
+    if name == 'orjson':
+        import orjson
+        return JSONCodec(name, orjson.dumps, orjson.loads)
+    if name == 'ujson':
+        import ujson
+        return JSONCodec(name, lambda obj: ujson.dumps(obj, escape_forward_slashes=False),
+                         ujson.loads)
+    if name == 'simplejson':
+        import simplejson
+        return JSONCodec(name, simplejson.dumps, simplejson.loads)
+    if name == 'json':
+        import json
+        return JSONCodec(name, json.dumps, json.loads)
+    raise ValueError('Unknown JSON backend {}'.format(name))
+
+
+_codecs = {}
+
+
+def get_codec(name=None):
+    """Return the codec of the named backend, or of the fastest installed"""
+    for backend in ([name] if name else BACKENDS):
+        if backend not in _codecs:
+            try:
+                _codecs[backend] = _load_backend(backend)
+            except ImportError:
+                if name:
+                    raise
+                continue
+            logger.debug('Using {} JSON backend'.format(backend))
+        return _codecs[backend]
+
+
+def available_codecs():
+    codecs = []
+    for backend in BACKENDS:
+        try:
+            codecs.append(get_codec(backend))
+        except ImportError:
+            pass
+    return codecs
@@ -1,6 +1,5 @@
-from json import loads
-from munch import munchify
 from client import APIBaseClient, verify_file
+from paths import access_headers, item_path
 
 
 class ContractingClient(APIBaseClient):
@@ -9,35 +8,30 @@ class ContractingClient(APIBaseClient):
     def __init__(self, key,
                  host_url="https://api-sandbox.openprocurement.org",
                  api_version='2.0',
-                 params=None):
+                 params=None,
+                 **kwargs):
         super(ContractingClient, self).__init__(key, host_url, api_version,
-                                                "contracts", params)
+                                                "contracts", params, **kwargs)
 
     @verify_file
-    def upload_document(self, file_, contract):
+    def upload_document(self, file_, contract, progress=None):
         return self._upload_resource_file(
-            '{}/{}/documents'.format(
-                self.prefix_path,
-                contract.data.id
-            ),
+            item_path(self.prefix_path, contract.data.id, "documents"),
             data={"file": file_},
-            headers={'X-Access-Token':
-                     getattr(getattr(contract, 'access', ''), 'token', '')}
+            progress=progress,
+            headers=access_headers(contract)
         )
 
     def create_contract(self, contract):
         return self._create_resource_item(self.prefix_path, contract)
 
     def get_contract(self, id):
-        return self._get_resource_item('{}/{}'.format(self.prefix_path, id))
+        return self._get_resource_item(item_path(self.prefix_path, id))
 
-    def get_contracts(self, params={}, feed='changes'):
+    def get_contracts_bulk(self, ids, concurrency=10):
+        return self._get_resource_items(ids, concurrency)
+
+    def get_contracts(self, params={}, feed='changes', stream=False):
         params['feed'] = feed
         self._update_params(params)
-        response = self.get(
-            self.prefix_path,
-            params_dict=self.params)
-        if response.status_int == 200:
-            data = munchify(loads(response.body_string()))
-            self._update_params(data.next_page)
-            return data.data
+        return self._get_resource_list(stream)
@@ -8,3 +8,7 @@ class NoToken(Exception):
 
 class IdNotFound(Exception):
     pass
+
+
+class CircuitOpen(Exception):
+    pass
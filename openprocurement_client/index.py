@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import anydbm
+import logging
+
+from .sync import iter_pages
+
+logger = logging.getLogger(__name__)
+
+
+class TenderIDIndex(object):
+    """Local index from tenderID (UA-id) to the internal tender id.
+
+    Kept in an anydbm file when ``path`` is given, in memory otherwise.
+    ``update`` walks the feed from where it stopped last time, so the
+    index stays current with one pass over new changes.
+    """
+
+    offset_key = '__offset__'
+
+    def __init__(self, path=None, id_field='tenderID'):
+        self.id_field = id_field
+        self.db = anydbm.open(path, 'c') if path else {}
+
+    def __len__(self):
+        return len(self.db) - (self.offset_key in self.db)
+
+    def get(self, ua_id):
+        try:
+            return self.db[ua_id.encode('utf-8')]
+        except KeyError:
+            return None
+
+    def add(self, items):
+        for item in items:
+            if self.id_field in item:
+                self.db[item[self.id_field].encode('utf-8')] = item['id'].encode('utf-8')
+
+    def update(self, client, params=None, read_ahead=1):
+        """Index every tender changed since the last update"""
+        params = dict(params or {}, opt_fields=self.id_field)
+        if self.offset_key in self.db:
+            params['offset'] = self.db[self.offset_key]
+        count = 0
+        for page in iter_pages(client, params, read_ahead=read_ahead):
+            self.add(page['data'])
+            count += len(page['data'])
+            self.db[self.offset_key] = str(page['next_page']['offset'])
+        logger.info("Indexed {} tenders".format(count))
+        return count
+
+    def sync(self):
+        if hasattr(self.db, 'sync'):
+            self.db.sync()
+
+    def close(self):
+        if hasattr(self.db, 'close'):
+            self.db.close()
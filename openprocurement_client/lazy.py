@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from munch import Munch
+
+
+def lazy_munchify(value):
+    """Wrap decoded JSON without copying it, unlike munchify.
+
+    Only the top level container is wrapped; nested dicts and lists
+    become LazyMunch and LazyList the first time they are accessed.
+    """
+    if type(value) is dict:
+        return LazyMunch(value)
+    if type(value) is list:
+        return LazyList(value)
+    return value
+
+
+class LazyMunch(Munch):
+    """Munch over a decoded dict that wraps nested values on access"""
+
+    def __init__(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        wrapped = lazy_munchify(value)
+        if wrapped is not value:
+            dict.__setitem__(self, key, wrapped)
+        return wrapped
+
+    def pop(self, key, *default):
+        return lazy_munchify(dict.pop(self, key, *default))
+
+    def itervalues(self):
+        for key in self:
+            yield self[key]
+
+    def iteritems(self):
+        for key in self:
+            yield key, self[key]
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+
+class LazyList(list):
+    """List over a decoded list that wraps nested values on access"""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazyList(list.__getitem__(self, index))
+        value = list.__getitem__(self, index)
+        wrapped = lazy_munchify(value)
+        if wrapped is not value:
+            list.__setitem__(self, index, wrapped)
+        return wrapped
+
+    def __getslice__(self, start, stop):
+        return self[slice(start, stop)]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reversed__(self):
+        for index in reversed(range(len(self))):
+            yield self[index]
+
+    def pop(self, *index):
+        return lazy_munchify(list.pop(self, *index))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""URL and header building shared by the clients.
+
+Kept free of any transport so every client flavour builds the same
+requests from the same objects.
+"""
+from iso8601 import parse_date
+
+
+def api_path(api_version, resource=None):
+    if resource is None:
+        return '/api/{}'.format(api_version)
+    return '/api/{}/{}'.format(api_version, resource)
+
+
+def item_path(prefix_path, *parts):
+    """Join ``prefix_path`` and ids/collection names into an item path"""
+    return '/'.join((prefix_path,) + tuple(
+        part if isinstance(part, basestring) else str(part) for part in parts))
+
+
+def latest_params(date, opt_field):
+    """Query of the test mode feed from ``date`` on, listing only ``opt_field``"""
+    return {'offset': parse_date(date).strftime('%Y-%m-%dT%H:%M:%S'),
+            'opt_fields': opt_field,
+            'mode': 'test'}
+
+
+def get_access_token(obj):
+    """Token of an object returned by a create call, '' if it has none"""
+    return getattr(getattr(obj, 'access', ''), 'token', '')
+
+
+def access_headers(obj, token=None):
+    return {'X-Access-Token': token or get_access_token(obj)}
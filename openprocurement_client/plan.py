@@ -1,9 +1,6 @@
 from client import APIBaseClient, InvalidResponse
-from iso8601 import parse_date
-from munch import munchify
-from restkit import BasicAuth, errors, request, Resource
-from retrying import retry
-from simplejson import dumps, loads
+from paths import access_headers, item_path, latest_params
+from restkit import BasicAuth, request, Resource
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,54 +11,30 @@ class PlansClient(APIBaseClient):
     def __init__(self, key,
                  host_url="https://api-sandbox.openprocurement.org",
                  api_version='0.8',
-                 params=None):
-        super(PlansClient, self).__init__(key, host_url,api_version, "plans", params)
+                 params=None,
+                 **kwargs):
+        super(PlansClient, self).__init__(key, host_url,api_version, "plans", params, **kwargs)
 
     ###########################################################################
     #             GET ITEMS LIST API METHODS
     ###########################################################################
 
-    @retry(stop_max_attempt_number=5)
-    def get_plans(self, params={}, feed='changes'):
+    def get_plans(self, params={}, feed='changes', stream=False):
         params['feed'] = feed
-        try:
-            self._update_params(params)
-            response = self.get(
-                self.prefix_path,
-                params_dict=self.params)
-            if response.status_int == 200:
-                plan_list = munchify(loads(response.body_string()))
-                self._update_params(plan_list.next_page)
-                return plan_list.data
-
-        except errors.ResourceNotFound:
-            del self.params['offset']
-            raise
-
-        raise InvalidResponse
+        self._update_params(params)
+        return self._get_resource_list(stream)
 
     def get_latest_plans(self, date):
-        iso_dt = parse_date(date)
-        dt = iso_dt.strftime("%Y-%m-%d")
-        tm = iso_dt.strftime("%H:%M:%S")
-        response = self._get_resource_item(
-            '{}?offset={}T{}&opt_fields=plan_id&mode=test'.format(
-                self.prefix_path,
-                dt,
-                tm
-            )
-        )
+        response = self.get(self.prefix_path,
+                            params_dict=latest_params(date, 'plan_id'))
         if response.status_int == 200:
-            plan_list = munchify(loads(response.body_string()))
-            self._update_params(plan_list.next_page)
-            return plan_list.data
+            return self._decode_list(response)
         raise InvalidResponse
 
     def _get_plan_resource_list(self, plan, items_name):
         return self._get_resource_item(
-            '{}/{}/{}'.format(self.prefix_path, plan.data.id, items_name),
-            headers={'X-Access-Token':
-                     getattr(getattr(plan, 'access', ''), 'token', '')}
+            item_path(self.prefix_path, plan.data.id, items_name),
+            headers=access_headers(plan)
         )
 
     ###########################################################################
@@ -70,10 +43,9 @@ class PlansClient(APIBaseClient):
 
     def _create_plan_resource_item(self, plan, item_obj, items_name):
         return self._create_resource_item(
-            '{}/{}/{}'.format(self.prefix_path, plan.data.id, items_name),
+            item_path(self.prefix_path, plan.data.id, items_name),
             item_obj,
-            headers={'X-Access-Token':
-                     getattr(getattr(plan, 'access', ''), 'token', '')}
+            headers=access_headers(plan)
         )
 
     def create_plan(self, plan):
@@ -84,21 +56,16 @@ class PlansClient(APIBaseClient):
     ###########################################################################
 
     def get_plan(self, plan_id):
-        return self._get_resource_item('{}/{}'.format(self.prefix_path, plan_id))
+        return self._get_resource_item(item_path(self.prefix_path, plan_id))
+
+    def get_plans_bulk(self, ids, concurrency=10):
+        return self._get_resource_items(ids, concurrency)
 
     def _get_plan_resource_item(self, plan, item_id, items_name,
                                   access_token=""):
-        if access_token:
-            headers = {'X-Access-Token': access_token}
-        else:
-            headers = {'X-Access-Token':
-                       getattr(getattr(plan, 'access', ''), 'token', '')}
         return self._get_resource_item(
-            '{}/{}/{}/{}'.format(self.prefix_path,
-                                 plan.data.id,
-                                 items_name,
-                                 item_id),
-            headers=headers
+            item_path(self.prefix_path, plan.data.id, items_name, item_id),
+            headers=access_headers(plan, access_token)
         )
 
     ###########################################################################
@@ -107,18 +74,15 @@ class PlansClient(APIBaseClient):
 
     def _patch_plan_resource_item(self, plan, item_obj, items_name):
         return self._patch_resource_item(
-            '{}/{}/{}/{}'.format(
-                self.prefix_path, plan.data.id, items_name, item_obj['data']['id']
-            ),
+            item_path(self.prefix_path, plan.data.id, items_name,
+                      item_obj['data']['id']),
             payload=item_obj,
-            headers={'X-Access-Token':
-                     getattr(getattr(plan, 'access', ''), 'token', '')}
+            headers=access_headers(plan)
         )
 
     def patch_plan(self, plan):
         return self._patch_resource_item(
-            '{}/{}'.format(self.prefix_path, plan["data"]["id"]),
+            item_path(self.prefix_path, plan["data"]["id"]),
             payload=plan,
-            headers={'X-Access-Token':
-                     getattr(getattr(plan, 'access', ''), 'token', '')}
+            headers=access_headers(plan)
         )
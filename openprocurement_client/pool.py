@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+from restkit.conn import Connection
+from socketpool import ConnectionPool as BaseConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection(Connection):
+    """Connection that gives its slot back to the pool however it ends"""
+
+    def release(self, should_close=False):
+        pool = self._pool
+        super(PooledConnection, self).release(should_close)
+        if pool is not None:
+            pool.checkin(self)
+
+    def close(self):
+        # restkit only closes, without releasing, after some socket errors.
+        super(PooledConnection, self).close()
+        if self._pool is not None:
+            self._pool.checkin(self)
+
+
+class ConnectionPool(BaseConnectionPool):
+    """Keep-alive pool of restkit connections that clients can share.
+
+    Pass it as ``pool`` to any client, or install it with
+    ``set_default_pool`` to have every client created afterwards use it.
+    ``max_size`` caps the connections kept alive between requests,
+    ``max_idle`` closes the ones unused for that many seconds and
+    ``max_lifetime`` the ones older than that. ``max_connections`` caps
+    the connections in use at once: requests beyond it wait for one to
+    be released. ``stats()`` counts pool hits, new connections and
+    evictions.
+    """
+
+    def __init__(self, max_size=50, max_idle=60., max_lifetime=600.,
+                 max_connections=None, backend='thread', **options):
+        super(ConnectionPool, self).__init__(
+            PooledConnection, max_size=max_size, max_lifetime=max_lifetime,
+            backend=backend, **options)
+        self.factory = self._connect
+        self.max_idle = max_idle
+        self.max_connections = max_connections
+        self._slots = (self.backend_mod.Semaphore(max_connections)
+                       if max_connections is not None else None)
+        self.in_use = 0
+        self.hits = 0
+        self.new_connections = 0
+        self.evictions = 0
+
+    def _connect(self, **options):
+        conn = PooledConnection(**options)
+        self.new_connections += 1
+        return conn
+
+    def get(self, **options):
+        if self._slots is not None:
+            self._slots.acquire()
+        new_connections = self.new_connections
+        try:
+            conn = super(ConnectionPool, self).get(**options)
+        except Exception:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+        conn._checked_out = True
+        self.in_use += 1
+        if self.new_connections == new_connections:
+            self.hits += 1
+        return conn
+
+    def checkin(self, conn):
+        """Free the slot of a connection handed out by get"""
+        if getattr(conn, '_checked_out', False):
+            conn._checked_out = False
+            self.in_use -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    def release_connection(self, conn):
+        conn._idle_since = time.time()
+        super(ConnectionPool, self).release_connection(conn)
+
+    def too_old(self, conn):
+        if super(ConnectionPool, self).too_old(conn):
+            return True
+        idle_since = getattr(conn, '_idle_since', None)
+        return (self.max_idle is not None and idle_since is not None
+                and time.time() - idle_since > self.max_idle)
+
+    def _reap_connection(self, conn):
+        if conn.is_connected():
+            self.evictions += 1
+        super(ConnectionPool, self)._reap_connection(conn)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'new_connections': self.new_connections,
+            'evictions': self.evictions,
+            'in_use': self.in_use,
+            'idle': self.size,
+        }
+
+
+_default_pool = None
+
+
+def get_default_pool():
+    return _default_pool
+
+
+def set_default_pool(pool):
+    """Make clients created without an explicit ``pool`` share this one"""
+    global _default_pool
+    _default_pool = pool
+    return pool
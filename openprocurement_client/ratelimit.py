@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import fcntl
+import logging
+from time import time
+
+from gevent import sleep
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket(object):
+    """``rate`` requests a second with bursts of up to ``burst``.
+
+    ``reserve`` takes a token and says how long to wait before using it,
+    so concurrent callers queue up instead of racing for the next token.
+    ``throttle`` halves the rate, down to ``min_factor`` of ``rate``, and
+    the rate grows back to ``rate`` over ``recovery`` seconds. With
+    ``path`` the bucket lives in that file, locked on every update, and
+    buckets of all processes using the path draw from the same tokens;
+    a path on tmpfs (e.g. /dev/shm) keeps it in shared memory.
+    """
+
+    def __init__(self, rate, burst=None, path=None, min_factor=0.1, recovery=60.):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1., self.rate))
+        self.path = path
+        self.min_factor = min_factor
+        self.recovery = recovery
+        # tokens, last update, rate factor after the last 429, time of that 429
+        self.state = (self.burst, time(), 1., 0.)
+
+    def factor(self, state=None, now=None):
+        """Share of ``rate`` allowed now"""
+        _, _, factor, throttled_at = state or self._update(None)
+        if not throttled_at:
+            return 1.
+        elapsed = (now or time()) - throttled_at
+        return min(1., factor + (1. - factor) * elapsed / self.recovery)
+
+    def reserve(self, tokens=1):
+        """Take tokens, return seconds to wait before sending"""
+        def take(state, now):
+            rate = self.rate * self.factor(state, now)
+            available = self._refill(state, now, rate) - tokens
+            return (available, now) + state[2:], max(0., -available / rate)
+        return self._update(take)
+
+    def throttle(self, retry_after=None):
+        """Slow down after a 429, pausing for retry_after seconds if given"""
+        def tighten(state, now):
+            factor = max(self.min_factor, self.factor(state, now) / 2)
+            available = self._refill(state, now, self.rate * factor)
+            if retry_after:
+                available = min(available, -retry_after * self.rate * factor)
+            logger.info("Rate limited to {:.2f}/s".format(self.rate * factor))
+            return (available, now, factor, now), None
+        self._update(tighten)
+
+    def _refill(self, state, now, rate):
+        tokens, updated = state[:2]
+        return min(self.burst, tokens + max(0., now - updated) * rate)
+
+    def _update(self, change):
+        """Apply change to the state, return its result or the state"""
+        if self.path is None:
+            return self._apply(change, self.state)
+        with open(self.path, 'a+') as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                values = state_file.read().split()
+                if len(values) == len(self.state):
+                    self.state = tuple(float(value) for value in values)
+                result = self._apply(change, self.state)
+                if change is not None:
+                    state_file.seek(0)
+                    state_file.truncate()
+                    state_file.write(' '.join(repr(v) for v in self.state))
+                    state_file.flush()
+                return result
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def _apply(self, change, state):
+        if change is None:
+            return state
+        self.state, result = change(state, time())
+        return result
+
+
+class RateLimiter(object):
+    """Global and per-family request budgets shared by clients.
+
+    ``rate``/``burst`` bound all requests of the clients given this
+    limiter, ``limits`` maps an endpoint family (tenders, plans,
+    contracts, documents, edr) to its own ``rate`` or ``(rate, burst)``.
+    A 429 tightens the buckets of the family that got it and the global
+    one. With ``path`` the global bucket is kept in ``path`` and the
+    family ones in ``path.<family>``, see TokenBucket.
+    """
+
+    def __init__(self, rate=None, burst=None, limits=None, path=None, **options):
+        self.bucket = TokenBucket(rate, burst, path, **options) if rate else None
+        self.buckets = {}
+        for name, limit in (limits or {}).items():
+            limit_rate, limit_burst = limit if isinstance(limit, tuple) else (limit, None)
+            self.buckets[name] = TokenBucket(
+                limit_rate, limit_burst, '{}.{}'.format(path, name) if path else None,
+                **options)
+
+    def _buckets(self, name):
+        return [bucket for bucket in (self.bucket, self.buckets.get(name))
+                if bucket is not None]
+
+    def wait(self, name):
+        """Block until a request of family name fits the budgets"""
+        delay = max([bucket.reserve() for bucket in self._buckets(name)] or [0.])
+        if delay:
+            sleep(delay)
+        return delay
+
+    def throttled(self, name, retry_after=None):
+        for bucket in self._buckets(name):
+            bucket.throttle(retry_after)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import logging
+import random
+import socket
+from email.utils import mktime_tz, parsedate_tz
+from time import time
+
+from restkit.errors import (BadStatusLine, NoMoreData, ParserError, RequestError,
+                            RequestTimeout, ResourceError, UnexpectedEOF)
+
+logger = logging.getLogger(__name__)
+
+# Errors raised before a response was read: the request may or may not
+# have reached the server.
+TRANSPORT_ERRORS = (socket.error, RequestError, RequestTimeout, UnexpectedEOF,
+                    BadStatusLine, NoMoreData, ParserError)
+
+
+def _retry_after(error):
+    """Seconds the server asked to wait in Retry-After, None if it did not"""
+    response = getattr(error, 'response', None)
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0., float(value))
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0., mktime_tz(date) - time())
+
+
+class RetryPolicy(object):
+    """When to resend a failed request and how long to wait before.
+
+    Idempotent methods are resent after transport errors and on any of
+    ``retry_statuses``; other methods only on 429, which the server
+    answers without doing anything. Waits grow exponentially from
+    ``backoff`` up to ``max_backoff`` with full jitter, or follow the
+    server's Retry-After on 429/503. No attempt starts after
+    ``max_attempts`` attempts or past ``deadline`` seconds since the
+    first one.
+    """
+
+    def __init__(self, max_attempts=5, backoff=0.5, max_backoff=30., deadline=120.,
+                 idempotent_methods=('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'),
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.idempotent_methods = idempotent_methods
+        self.retry_statuses = retry_statuses
+
+    def retryable(self, method, error):
+        if isinstance(error, ResourceError):
+            if error.status_int == 429:
+                return True
+            return method in self.idempotent_methods and error.status_int in self.retry_statuses
+        return method in self.idempotent_methods and isinstance(error, TRANSPORT_ERRORS)
+
+    def delay(self, attempt, error):
+        """Seconds to wait before attempt number attempt + 1"""
+        if getattr(error, 'status_int', None) in (429, 503):
+            retry_after = _retry_after(error)
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def next_delay(self, method, error, attempt, started):
+        """Wait before resending after attempt failed, None to give up"""
+        if attempt >= self.max_attempts or not self.retryable(method, error):
+            return None
+        delay = self.delay(attempt, error)
+        if self.deadline is not None and time() + delay - started > self.deadline:
+            return None
+        logger.info("Retry {} in {:.2f}s after attempt {}: {!r}".format(
+            method, delay, attempt, error))
+        return delay
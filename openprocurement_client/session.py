@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+from collections import OrderedDict
+from zlib import crc32
+from Cookie import CookieError, SimpleCookie
+from tempfile import NamedTemporaryFile
+
+logger = logging.getLogger(__name__)
+
+
+class CookieJar(object):
+    """Session cookies shared by the clients built with the same jar.
+
+    The API pins a session to a backend with the SERVER_ID cookie, which
+    clients pick up from the first response that sets it. With ``path``
+    the cookies are also kept in that file, so worker processes started
+    with jars on the same path share one session.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.cookies = {}
+        # Set once a client sent the HEAD that obtains the session cookie.
+        self.bootstrapped = False
+        self._mtime = None
+
+    def jar(self, key):
+        return self
+
+    def pin(self, key, jar):
+        pass
+
+    def header(self):
+        """Value of the Cookie request header, '' without cookies"""
+        if self.path is not None:
+            self._reload()
+        return self._format()
+
+    def _format(self):
+        return '; '.join('{}={}'.format(name, value)
+                         for name, value in sorted(self.cookies.items()))
+
+    def update(self, set_cookie):
+        """Store the cookies of a Set-Cookie response header"""
+        cookie = SimpleCookie()
+        try:
+            cookie.load(set_cookie)
+        except CookieError:
+            logger.warning("Can't parse cookie {}".format(set_cookie))
+            return
+        cookies = dict(self.cookies)
+        cookies.update((name, morsel.value) for name, morsel in cookie.items())
+        if cookies != self.cookies:
+            self.cookies = cookies
+            if self.path is not None:
+                self._save()
+
+    def clear(self):
+        self.cookies = {}
+        self.bootstrapped = False
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with open(self.path) as cookie_file:
+                header = cookie_file.read()
+            self._mtime = mtime
+            self.cookies = dict(pair.split('=', 1) for pair in header.split('; ') if '=' in pair)
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with NamedTemporaryFile('w', dir=directory, delete=False) as cookie_file:
+            cookie_file.write(self._format())
+        os.rename(cookie_file.name, self.path)
+        self._mtime = os.stat(self.path).st_mtime
+
+
+class SessionPool(object):
+    """``size`` independent sessions, each object pinned to one of them.
+
+    Used as a client's ``cookies``, it sends every request about a tender
+    (plan, contract) with the cookie of the session its id hashes to.
+    Each session gets its own SERVER_ID, so different objects spread
+    over the backends while reads of one object still follow its
+    writes. With ``path``, session ``n`` is kept in ``path.n``.
+
+    An object created through the pool stays pinned to the session
+    that created it, up to ``max_pins`` most recent ones, as its id was
+    not known to pick a session by. Pins are not shared between
+    processes.
+    """
+
+    def __init__(self, size=8, path=None, max_pins=10000):
+        self.jars = [CookieJar('{}.{}'.format(path, n) if path else None)
+                     for n in range(size)]
+        self.max_pins = max_pins
+        self.pins = OrderedDict()
+
+    def __len__(self):
+        return len(self.jars)
+
+    def jar(self, key):
+        if key in self.pins:
+            return self.pins[key]
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        return self.jars[(crc32(key) & 0xffffffff) % len(self.jars)]
+
+    def pin(self, key, jar):
+        """Send the requests about key through jar"""
+        self.pins.pop(key, None)
+        self.pins[key] = jar
+        while len(self.pins) > self.max_pins:
+            self.pins.popitem(last=False)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import codecs
+
+from simplejson import JSONDecoder
+
+CHUNK_SIZE = 64 * 1024
+# Characters that may follow a complete value
+VALUE_ENDS = u' \t\n\r,:]}'
+
+
+class PageStream(object):
+    """Decode the items of a JSON list page while it is being read.
+
+    Iterating yields the elements of the ``list_key`` array one by one,
+    reading ``body`` (any object with a ``read(size)`` method) only as
+    far as needed. The other top level fields, e.g. ``next_page``, are
+    in ``fields`` once iteration is over.
+    """
+
+    def __init__(self, body, list_key='data', chunk_size=CHUNK_SIZE):
+        self.body = body
+        self.list_key = list_key
+        self.chunk_size = chunk_size
+        self.fields = {}
+        self._decoder = JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = u''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            raise ValueError('Unexpected end of JSON page')
+        chunk = self.body.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+        if self._pos > self.chunk_size:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        self._buf += self._utf8.decode(chunk, final=self._eof)
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buf):
+                char = self._buf[self._pos]
+                if not char.isspace():
+                    return char
+                self._pos += 1
+            self._fill()
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char not in chars:
+            raise ValueError('Expected {!r} at {}, got {!r}'.format(
+                chars, self._pos, char))
+        self._pos += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                self._fill()
+                continue
+            # A number cut by the end of the buffer, possibly right after
+            # '.', 'e' or '-', continues in the next chunk.
+            if not self._eof and (end == len(self._buf) or
+                                  self._buf[end] not in VALUE_ENDS):
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == self.list_key:
+                self._expect('[')
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                self.fields[key] = self._value()
+            if self._expect(',}') == '}':
+                return
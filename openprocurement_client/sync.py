@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import datetime
+from time import time
+
+from gevent import killall, sleep, spawn
+from gevent.pool import Pool
+from gevent.queue import Queue
+
+from iso8601 import UTC, parse_date
+
+from restkit.errors import ResourceError
+
+from .paths import item_path
+from .retry import TRANSPORT_ERRORS
+
+logger = logging.getLogger(__name__)
+
+
+def _feed_params(client, params, feed):
+    feed_params = dict(client.params)
+    feed_params.pop('offset', None)
+    feed_params.pop('descending', None)
+    feed_params.update(params or {})
+    feed_params['feed'] = feed
+    return feed_params
+
+
+def _transient(error):
+    """Whether a feed request that failed with error may succeed later"""
+    if isinstance(error, ResourceError):
+        return error.status_int >= 500 or error.status_int == 429
+    return isinstance(error, TRANSPORT_ERRORS)
+
+
+class _CursorError(object):
+    """Queued by a feed cursor that stopped on error"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class AdaptivePoller(object):
+    """Choose the delay before the next feed request from the last page.
+
+    A page filled up to ``full_ratio`` of ``limit`` means more changes
+    are waiting, so the next request goes out at once. A partial page
+    means the cursor caught up, so the feed is polled again after
+    ``min_interval``. Every empty page multiplies the interval by
+    ``backoff``, up to ``max_interval``.
+    """
+
+    def __init__(self, min_interval=1, max_interval=300, backoff=2,
+                 limit=100, full_ratio=0.9):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.limit = limit
+        self.full_ratio = full_ratio
+        self.interval = 0
+        self.behind = True
+        self.last_poll = None
+        self.last_date_modified = None
+
+    def update(self, items):
+        self.last_poll = time()
+        if items and items[-1].get('dateModified'):
+            self.last_date_modified = items[-1]['dateModified']
+        self.behind = len(items) >= self.limit * self.full_ratio
+        if self.behind:
+            self.interval = 0
+        elif items:
+            self.interval = min(self.min_interval, self.max_interval)
+        else:
+            self.interval = min(max(self.interval, self.min_interval) * self.backoff,
+                                self.max_interval)
+        return self.interval
+
+    @property
+    def lag(self):
+        """Seconds the consumer may be behind the head of the feed"""
+        if self.last_poll is None:
+            return None
+        if self.behind and self.last_date_modified:
+            delta = datetime.now(UTC) - parse_date(self.last_date_modified)
+            return max(delta.total_seconds(), 0)
+        return time() - self.last_poll
+
+
+def iter_pages(client, params=None, feed='changes', read_ahead=1):
+    """Yield pages of the resource list, fetching ahead of the consumer.
+
+    The next page is requested as soon as the offset of the current one
+    is known, and up to ``read_ahead`` fetched pages wait for the
+    consumer, so the HTTP round trip overlaps with page processing.
+    Iteration stops on the first empty page; client.params is left
+    untouched, the offset to resume from is in the last page's
+    ``next_page``.
+    """
+    if read_ahead < 1:
+        raise ValueError('read_ahead must be at least 1')
+    pages = Queue(maxsize=read_ahead)
+    params = _feed_params(client, params, feed)
+
+    def fetch():
+        try:
+            while True:
+                page = client._get_resource_page(params)
+                pages.put(page)
+                if not page['data']:
+                    return
+                params['offset'] = page['next_page']['offset']
+        except Exception as e:
+            pages.put(e)
+
+    fetcher = spawn(fetch)
+    try:
+        while True:
+            page = pages.get()
+            if isinstance(page, Exception):
+                raise page
+            yield page
+            if not page['data']:
+                return
+    finally:
+        fetcher.kill()
+
+
+def expand_items(client, items, fetch=None, concurrency=10, ordered=False):
+    """Fetch the full object for every feed item with a pool of greenlets.
+
+    Yields ``(item, result)`` pairs, where result is the object returned
+    by ``fetch(item['id'])`` (the client's resource by default) or the
+    exception it raised. Pairs come in completion order, or in the
+    order of ``items`` when ``ordered`` is set. At most ``concurrency``
+    requests are in flight and as many results wait for the consumer;
+    ``items`` is read only as fast as the pool frees up.
+    """
+    if fetch is None:
+        def fetch(item_id):
+            return client._get_resource_item(
+                item_path(client.prefix_path, item_id))
+
+    def expand(item):
+        try:
+            return item, fetch(item['id'])
+        except Exception as e:
+            logger.warning("Can't get {}: {}".format(item['id'], e))
+            return item, e
+
+    pool = Pool(concurrency)
+    mapper = pool.imap if ordered else pool.imap_unordered
+    return mapper(expand, items, maxsize=concurrency)
+
+
+class ResourceFeeder(object):
+    """Feed a resource list into one bounded queue from two cursors.
+
+    The backward cursor walks the feed from the newest change to the
+    oldest one (``descending=1``) and stops on the first empty page.
+    The forward cursor starts where the backward one began and keeps
+    tailing new changes, pausing between pages as ``poller`` decides
+    (an AdaptivePoller capped at ``sleep_time`` by default).
+    Both cursors run in their own greenlet, so sockets must be
+    patched by gevent for them to overlap.
+    A page that fails with a connection error, 5xx or 429 is requested
+    again after ``sleep_time``; any other error stops the feeder and is
+    raised from the iteration.
+
+    Works with any APIBaseClient subclass, e.g. TendersClient,
+    PlansClient or ContractingClient.
+    """
+
+    def __init__(self, client, params=None, feed='changes',
+                 queue_size=100, sleep_time=10, poller=None):
+        self.client = client
+        self.params = _feed_params(client, params, feed)
+        self.queue = Queue(maxsize=queue_size)
+        self.sleep_time = sleep_time
+        self.poller = poller or AdaptivePoller(
+            max_interval=sleep_time, limit=int(self.params.get('limit', 100)))
+        self.backward_params = None
+        self.forward_params = None
+        self.backfilled = False
+        self.workers = []
+
+    def _fetch(self, params):
+        """Get a page, waiting out connection errors and 5xx/429 answers"""
+        while True:
+            try:
+                return self.client._get_resource_page(params)
+            except Exception as e:
+                if not _transient(e):
+                    raise
+                logger.warning("Can't get page with offset {}: {}".format(
+                    params.get('offset', ''), e))
+                sleep(self.sleep_time)
+
+    def _run(self, cursor, *args):
+        try:
+            cursor(*args)
+        except Exception as e:
+            logger.error("Feed cursor stopped: {!r}".format(e))
+            self.queue.put(_CursorError(e))
+
+    def _backward(self, page):
+        while page['data']:
+            for item in page['data']:
+                self.queue.put(item)
+            self.backward_params['offset'] = page['next_page']['offset']
+            page = self._fetch(self.backward_params)
+        logger.info("Backward cursor reached the end of the feed")
+        self.backfilled = True
+
+    def _forward(self):
+        while True:
+            page = self._fetch(self.forward_params)
+            for item in page['data']:
+                self.queue.put(item)
+            self.forward_params['offset'] = page['next_page']['offset']
+            sleep(self.poller.update(page['data']))
+
+    def start(self):
+        self.backward_params = dict(self.params, descending=1)
+        self.forward_params = dict(self.params)
+        first_page = self._fetch(self.backward_params)
+        if first_page.get('prev_page'):
+            self.forward_params['offset'] = first_page['prev_page']['offset']
+        self.workers = [spawn(self._run, self._backward, first_page),
+                        spawn(self._run, self._forward)]
+
+    def stop(self):
+        killall(self.workers)
+        self.workers = []
+
+    def __iter__(self):
+        if not self.workers:
+            self.start()
+        while True:
+            item = self.queue.get()
+            if isinstance(item, _CursorError):
+                self.stop()
+                raise item.error
+            yield item
@@ -1,5 +1,6 @@
 from bottle import request, response, redirect, static_file
 from munch import munchify
+from hashlib import md5
 from simplejson import dumps, load
 from uuid import uuid4
 import os
@@ -39,18 +40,64 @@ def tenders_page_get():
         tenders = load(json)
     return dumps(tenders)
 
+def tenders_feed_get():
+    with open(ROOT + 'tenders.json') as json:
+        tenders = load(json)
+    return dumps(feed_page(tenders['data'], TENDERS_PATH))
+
+def conditional(body):
+    """Send an ETag with the body, or 304 when the client has that version"""
+    etag = '"{}"'.format(md5(body).hexdigest())
+    response.set_header('ETag', etag)
+    if request.headers.get('If-None-Match') == etag:
+        response.status = 304
+        return ''
+    return body
+
+def tender_uaid(tender):
+    return 'UA-{}'.format(tender['id'][:12])
+
+def feed_page(items, path):
+    """Paginate a listing by dateModified, like the API does"""
+    descending = bool(request.query.get('descending'))
+    offset = request.query.get('offset', '')
+    limit = int(request.query.get('limit', 10))
+    items = sorted(items, key=lambda i: i['dateModified'], reverse=descending)
+    if offset:
+        items = [i for i in items
+                 if (i['dateModified'] < offset if descending
+                     else i['dateModified'] > offset)]
+    page = {"data": items[:limit]}
+    if 'tenderID' in request.query.get('opt_fields', ''):
+        for item in page['data']:
+            item['tenderID'] = tender_uaid(item)
+    next_offset = page['data'][-1]['dateModified'] if page['data'] else offset
+    page['next_page'] = {"offset": next_offset,
+                         "path": path + '?offset=' + next_offset}
+    if page['data']:
+        page['prev_page'] = {"offset": page['data'][0]['dateModified'],
+                             "path": path + '?offset=' + page['data'][0]['dateModified']}
+    return page
+
 ### Tender operations
 #
 
-def tender_create():
+def created(obj):
+    """201 with the Location of the new object, as the API answers creates"""
     response.status = 201
-    return request.json
+    data = obj.get('data') if isinstance(obj, dict) else None
+    if isinstance(data, dict) and data.get('id'):
+        response.set_header('Location', '{}/{}'.format(request.url, data['id']))
+    return obj
+
+def tender_create():
+    return created(request.json)
 
 def tender_page(tender_id):
     tender = tender_partition(tender_id)
     if not tender:
         return location_error("tender")
-    return dumps(tender)
+    return conditional(dumps(tender))
 
 def tender_patch(tender_id):
     tender = tender_partition(tender_id)
@@ -64,7 +111,7 @@ def tender_patch(tender_id):
 
 def tender_subpage(tender_id, subpage_name):
     subpage = tender_partition(tender_id, subpage_name)
-    return dumps({"data": subpage})
+    return conditional(dumps({"data": subpage}))
 
 def tender_award_documents(tender_id, award_id):
     tender = tender_partition(tender_id)
@@ -123,6 +170,7 @@ def tender_document_create(tender_id):
     response.status = 201
     document = tender_partition(tender_id, 'documents')[0]
     document.title = request.files.file.filename
+    document.hash = 'md5:' + md5(request.files.file.file.read()).hexdigest()
     document.id = '12345678123456781234567812345678'
     return dumps({"data": document})
 
@@ -200,15 +248,19 @@ def plans_page_get():
         plans = load(json)
     return dumps(plans)
 
+def plans_feed_get():
+    with open(ROOT + 'plans.json') as json:
+        plans = load(json)
+    return dumps(feed_page(plans['data'], PLANS_PATH))
+
 def plan_create():
-    response.status = 201
-    return request.json
+    return created(request.json)
 
 def plan_page(plan_id):
     plan = plan_partition(plan_id)
     if not plan:
         return location_error("plan")
-    return dumps(plan)
+    return conditional(dumps(plan))
 
 def plan_patch(plan_id):
     plan = plan_partition(plan_id)
@@ -241,14 +293,13 @@ def contracts_page_get():
     return dumps(contracts)
 
 def contract_create():
-    response.status = 201
-    return request.json
+    return created(request.json)
 
 def contract_page(contract_id):
     contract = contract_partition(contract_id)
     if not contract:
         return location_error("contract")
-    return dumps(contract)
+    return conditional(dumps(contract))
 
 def contract_patch(contract_id):
     contract = contract_partition(contract_id)
@@ -281,6 +332,7 @@ routs_dict = {
         "spore": (SPORE_PATH, 'HEAD', spore),
         "offset_error": (TENDERS_PATH, 'GET', offset_error),
         "tenders": (TENDERS_PATH, 'GET', tenders_page_get),
+        "tenders_feed": (TENDERS_PATH, 'GET', tenders_feed_get),
         "tender_create": (TENDERS_PATH, 'POST', tender_create),
         "tender": (TENDERS_PATH + "/<tender_id>", 'GET', tender_page),
         "tender_patch": (TENDERS_PATH + "/<tender_id>", 'PATCH', tender_patch),
@@ -299,6 +351,7 @@ routs_dict = {
         "redirect": ('/redirect/<filename:path>', 'GET', get_file),
         "download": ('/download/<filename:path>', 'GET', download_file),
         "plans": (PLANS_PATH, 'GET', plans_page_get),
+        "plans_feed": (PLANS_PATH, 'GET', plans_feed_get),
         "plan_create": (PLANS_PATH, 'POST', plan_create),
         "plan": (PLANS_PATH + "/<plan_id>", 'GET', plan_page),
         "plan_offset_error": (PLANS_PATH, 'GET', plan_offset_error),
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Time loads/dumps of every installed JSON backend on test payloads.
+
+Run with ``python -m openprocurement_client.tests.bench_codec [number]``.
+"""
+import os
+import sys
+from timeit import Timer
+
+from openprocurement_client.codec import available_codecs
+
+ROOT = os.path.join(os.path.dirname(__file__), 'data')
+PAYLOADS = (
+    '823d50b3236247adad28a5a66f74db42.json',
+    '668c3156c8cb496fb28359909cde6e96.json',
+    'tenders.json',
+    'plans.json',
+)
+
+
+def main(number=1000):
+    payloads = []
+    for name in PAYLOADS:
+        with open(os.path.join(ROOT, name), 'rb') as payload:
+            payloads.append((name, payload.read()))
+    print('{:<40} {:<12} {:>12} {:>12}'.format('payload', 'backend', 'loads, us', 'dumps, us'))
+    for name, raw in payloads:
+        for codec in available_codecs():
+            obj = codec.loads(raw)
+            loads_time = Timer(lambda: codec.loads(raw)).timeit(number)
+            dumps_time = Timer(lambda: codec.dumps(obj)).timeit(number)
+            print('{:<40} {:<12} {:>12.1f} {:>12.1f}'.format(
+                name, codec.name,
+                loads_time / number * 1e6, dumps_time / number * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -1,16 +1,48 @@
 from gevent import monkey; monkey.patch_all()
+from gevent import Timeout, joinall, sleep, spawn
 from gevent.pywsgi import WSGIServer
-from bottle import Bottle
+from gevent.subprocess import PIPE, Popen
+from bottle import Bottle, request, response
 from StringIO import StringIO
 from collections import Iterable
-from simplejson import loads, load
+from itertools import islice
+from simplejson import dumps, loads, load
 from munch import munchify
+from restkit.errors import RequestFailed, RequestTimeout, ResourceNotFound, Unauthorized
+from restkit.session import get_session
+from tempfile import mkdtemp, mktemp
+from hashlib import md5
+from uuid import uuid4
+import shutil
+from time import time
+import os
+import sys
 import unittest
 from openprocurement_client import client as tender_client
 from openprocurement_client.contract import ContractingClient
 from openprocurement_client import plan as plan_client
+from openprocurement_client.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakers
+from openprocurement_client.backfill import (crawl_window, merge_windows,
+                                             split_windows, _crawl)
+from openprocurement_client.cache import ResponseCache
+from openprocurement_client.exceptions import CircuitOpen
+from openprocurement_client.codec import available_codecs, get_codec
+from openprocurement_client.index import TenderIDIndex
+from openprocurement_client.lazy import LazyList, LazyMunch, lazy_munchify
+from openprocurement_client.paths import access_headers, api_path, item_path, latest_params
+from openprocurement_client.pool import ConnectionPool, get_default_pool, set_default_pool
+from openprocurement_client.ratelimit import RateLimiter, TokenBucket
+from openprocurement_client.retry import RetryPolicy
+from openprocurement_client.session import CookieJar, SessionPool
+from openprocurement_client.stream import PageStream
+from openprocurement_client.tracker import ChangeTracker
+from openprocurement_client.upload import MultipartBody
+from openprocurement_client.utils import get_tender_id_by_uaid, tenders_feed
+from openprocurement_client.sync import (AdaptivePoller, ResourceFeeder,
+                                         expand_items, iter_pages)
 from openprocurement_client.tests._server import (tender_partition, location_error,
-                                                 setup_routing, ROOT)
+                                                 setup_routing, tender_uaid, ROOT,
+                                                 tenders_feed_get, SPORE_PATH, TENDERS_PATH)
 
 
 HOST_URL = "http://localhost:20602"
@@ -55,6 +87,13 @@ TEST_CONTRACT_KEYS = munchify({
     "error_id": 'zzzxxx111'
 })
 
+def release_connections():
+    # Requests leave keep-alive connections in the shared restkit pool,
+    # which a stopped WSGIServer keeps serving with its old app; drop them
+    # so the next test talks to its own server.
+    get_session('thread').release_all()
+
+
 class ViewerTenderTestCase(unittest.TestCase):
     """"""
     def setUp(self):
@@ -73,6 +112,7 @@ class ViewerTenderTestCase(unittest.TestCase):
 
     def tearDown(self):
         self.server.stop()
+        release_connections()
 
 
     def test_get_tenders(self):
@@ -81,6 +121,20 @@ class ViewerTenderTestCase(unittest.TestCase):
         self.assertIsInstance(tenders, Iterable)
         self.assertEqual(tenders, self.tenders.data)
 
+    def test_get_latest_tenders(self):
+        setup_routing(self.app, routs=["tenders_feed"])
+        queries = []
+        self.app.add_hook('before_request', lambda: queries.append(dict(request.query)))
+        date = self.tenders.data[2].dateModified
+        tenders = self.client.get_latest_tenders(date, TEST_KEYS.tender_id)
+        self.assertEqual(queries[-1]['mode'], 'test')
+        self.assertEqual(queries[-1]['opt_fields'], 'tender_id')
+        offset = queries[-1]['offset']
+        self.assertEqual([tender.id for tender in tenders],
+                         [tender.id for tender in sorted(self.tenders.data, key=lambda t: t.dateModified)
+                          if tender.dateModified > offset][:10])
+        self.assertTrue(tenders)
+
     def test_get_tender(self):
         setup_routing(self.app, routs=["tender"])
         tender = self.client.get_tender(TEST_KEYS.tender_id)
@@ -114,6 +168,7 @@ class ViewerPlanTestCase(unittest.TestCase):
 
     def tearDown(self):
         self.server.stop()
+        release_connections()
 
 
     def test_get_plans(self):
@@ -122,6 +177,16 @@ class ViewerPlanTestCase(unittest.TestCase):
         self.assertIsInstance(plans, Iterable)
         self.assertEqual(plans, self.plans.data)
 
+    def test_get_latest_plans(self):
+        setup_routing(self.app, routs=["plans_feed"])
+        date = self.plans.data[5].dateModified
+        plans = self.client.get_latest_plans(date)
+        offset = latest_params(date, 'plan_id')['offset']
+        self.assertEqual([plan.id for plan in plans],
+                         [plan.id for plan in sorted(self.plans.data, key=lambda p: p.dateModified)
+                          if plan.dateModified > offset][:10])
+        self.assertTrue(plans)
+
     def test_get_plan(self):
         setup_routing(self.app, routs=["plan"])
         plan = self.client.get_plan(TEST_PLAN_KEYS.plan_id)
@@ -161,6 +226,7 @@ class UserTestCase(unittest.TestCase):
 
     def tearDown(self):
         self.server.stop()
+        release_connections()
 
 
     ###########################################################################
@@ -421,6 +487,30 @@ class UserTestCase(unittest.TestCase):
         self.assertEqual(test_file_data, doc[0])
         self.assertEqual(file_name, doc[1])
 
+    def test_download_file(self):
+        setup_routing(self.app, routs=["redirect","download"])
+        file_name = 'test_document.txt'
+        with open(ROOT + file_name) as local_file:
+            test_file_data = local_file.read()
+        url = HOST_URL + '/redirect/' + file_name
+        output = StringIO()
+        filename, size, hash_ = self.client.download_file(url, output, API_KEY, chunk_size=4)
+        self.assertEqual(output.getvalue(), test_file_data)
+        self.assertEqual((filename, size), (file_name, len(test_file_data)))
+        self.assertEqual(hash_, 'md5:' + md5(test_file_data).hexdigest())
+        path = mktemp()
+        try:
+            self.assertEqual(self.client.download_file(url, path), (filename, size, hash_))
+            with open(path) as saved:
+                self.assertEqual(saved.read(), test_file_data)
+        finally:
+            os.remove(path)
+
+    def test_download_file_dont_exist_error(self):
+        setup_routing(self.app, routs=["redirect","download"])
+        url = HOST_URL + '/redirect/error.txt'
+        self.assertRaises(tender_client.InvalidResponse, self.client.download_file, url, StringIO())
+
     def test_upload_tender_document(self):
         setup_routing(self.app, routs=["tender_document_create"])
         file_ = StringIO()
@@ -635,6 +725,7 @@ class ContractingUserTestCase(unittest.TestCase):
 
     def tearDown(self):
         self.server.stop()
+        release_connections()
 
     ###########################################################################
     #             CREATE ITEM TEST
@@ -661,5 +752,1305 @@ class ContractingUserTestCase(unittest.TestCase):
         file_.close()
 
 
+class ResourceFeederTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app)
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def _collect(self, feeder, count):
+        items = []
+        for item in feeder:
+            items.append(item)
+            if len(items) == count:
+                break
+        return items
+
+    def test_tenders_backfill_and_tail(self):
+        setup_routing(self.app, routs=["tenders_feed"])
+        with open(ROOT + 'tenders.json') as tenders:
+            tenders = load(tenders)['data']
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        feeder = ResourceFeeder(client, params={'limit': 10}, sleep_time=0.01)
+        items = self._collect(feeder, len(tenders))
+        feeder.workers[0].join(timeout=1)
+        feeder.stop()
+        self.assertEqual([i.dateModified for i in items],
+                         sorted([i['dateModified'] for i in tenders], reverse=True))
+        self.assertTrue(feeder.backfilled)
+        self.assertEqual(feeder.forward_params['offset'], tenders[-1]['dateModified'])
+        self.assertNotIn('descending', feeder.forward_params)
+        self.assertNotIn('offset', client.params)
+
+    def _feed_statuses(self, statuses):
+        def feed():
+            response.status = statuses.pop(0) if statuses else 200
+            return tenders_feed_get()
+        self.app.route(TENDERS_PATH, 'GET', feed)
+
+    def test_retry_server_errors(self):
+        self._feed_statuses([200, 503, 502])
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                             retry_policy=RetryPolicy(max_attempts=1))
+        feeder = ResourceFeeder(client, params={'limit': 10}, sleep_time=0.01)
+        items = self._collect(feeder, 20)
+        feeder.stop()
+        self.assertEqual(len(items), 20)
+
+    def test_client_error_stops(self):
+        self._feed_statuses([200, 412, 412])
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        feeder = ResourceFeeder(client, params={'limit': 10}, sleep_time=0.01)
+        with Timeout(2):
+            self.assertRaises(RequestFailed, self._collect, feeder, 1000)
+        self.assertEqual(feeder.workers, [])
+        self._feed_statuses([404])
+        self.assertRaises(ResourceNotFound, list, ResourceFeeder(client, sleep_time=0.01))
+
+    def test_plans(self):
+        setup_routing(self.app, routs=["plans_feed"])
+        with open(ROOT + 'plans.json') as plans:
+            plans = load(plans)['data']
+        client = plan_client.PlansClient('', host_url=HOST_URL, api_version=API_VERSION)
+        feeder = ResourceFeeder(client, params={'limit': 30}, sleep_time=0.01)
+        items = self._collect(feeder, len(plans))
+        feeder.stop()
+        self.assertEqual(set(i.id for i in items), set(i['id'] for i in plans))
+
+
+class PrefetchTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app)
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        setup_routing(self.app, routs=["tenders_feed"])
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        with open(ROOT + 'tenders.json') as tenders:
+            self.tenders = load(tenders)['data']
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_iter_pages(self):
+        pages = list(iter_pages(self.client, params={'limit': 10}, read_ahead=2))
+        self.assertEqual([len(page.data) for page in pages], [10, 10, 10, 6, 0])
+        self.assertEqual([i.id for page in pages for i in page.data],
+                         [i['id'] for i in self.tenders])
+        self.assertEqual(pages[-1].next_page.offset, self.tenders[-1]['dateModified'])
+        self.assertNotIn('offset', self.client.params)
+
+    def test_read_ahead(self):
+        requested = []
+        get_page = self.client._get_resource_page
+
+        def counting_get_page(params):
+            requested.append(params.get('offset'))
+            return get_page(params)
+        self.client._get_resource_page = counting_get_page
+
+        pages = iter_pages(self.client, params={'limit': 10}, read_ahead=2)
+        next(pages)
+        sleep(0.1)
+        self.assertGreaterEqual(len(requested), 3)
+        pages.close()
+
+    def test_read_ahead_validation(self):
+        with self.assertRaises(ValueError):
+            next(iter_pages(self.client, read_ahead=0))
+
+
+class AdaptivePollerTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.poller = AdaptivePoller(min_interval=1, max_interval=8, limit=10)
+        self.page = [munchify({'id': str(i), 'dateModified': '2015-11-13T18:50:00.753811+02:00'})
+                     for i in range(10)]
+
+    def test_full_page(self):
+        self.assertEqual(self.poller.update(self.page), 0)
+        self.assertTrue(self.poller.behind)
+        self.assertGreater(self.poller.lag, 0)
+
+    def test_partial_page(self):
+        self.assertEqual(self.poller.update(self.page[:3]), 1)
+        self.assertFalse(self.poller.behind)
+        self.assertLess(self.poller.lag, 1)
+
+    def test_backoff(self):
+        self.assertIsNone(self.poller.lag)
+        intervals = [self.poller.update([]) for _ in range(5)]
+        self.assertEqual(intervals, [2, 4, 8, 8, 8])
+        self.assertEqual(self.poller.update(self.page[:1]), 1)
+        self.assertEqual(self.poller.update(self.page), 0)
+        self.assertEqual(self.poller.update([]), 2)
+
+
+class ExpandItemsTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tender"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        self.items = [munchify({'id': tender_id}) for tender_id in
+                      (TEST_KEYS.tender_id, TEST_KEYS.empty_tender, TEST_KEYS_LIMITED.tender_id)]
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_expand_ordered(self):
+        results = list(expand_items(self.client, self.items, concurrency=2, ordered=True))
+        self.assertEqual([item for item, _ in results], self.items)
+        for item, tender in results:
+            self.assertEqual(tender, munchify(tender_partition(item.id)))
+
+    def test_expand_unordered(self):
+        results = list(expand_items(self.client, iter(self.items), concurrency=3))
+        self.assertEqual(sorted(item.id for item, _ in results),
+                         sorted(item.id for item in self.items))
+        for item, tender in results:
+            self.assertEqual(tender.data.id, item.id)
+
+    def test_error_capture(self):
+        def fetch(item_id):
+            if item_id == TEST_KEYS.empty_tender:
+                raise tender_client.InvalidResponse
+            sleep(0.01)
+            return self.client.get_tender(item_id)
+        results = list(expand_items(self.client, self.items, fetch=fetch,
+                                    concurrency=1, ordered=True))
+        self.assertEqual(len(results), 3)
+        self.assertIsInstance(results[1][1], tender_client.InvalidResponse)
+        self.assertEqual(results[2][1].data.id, TEST_KEYS_LIMITED.tender_id)
+
+
+class BulkGetTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tender", "plan"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_get_tenders_bulk(self):
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        ids = [TEST_KEYS.tender_id, TEST_KEYS.empty_tender, TEST_KEYS_LIMITED.tender_id]
+        results = dict(client.get_tenders_bulk(iter(ids), concurrency=2))
+        self.assertEqual(sorted(results), sorted(ids))
+        for tender_id in ids:
+            self.assertEqual(results[tender_id], munchify(tender_partition(tender_id)))
+
+    def test_get_plans_bulk(self):
+        client = plan_client.PlansClient('', host_url=HOST_URL, api_version=API_VERSION)
+        results = list(client.get_plans_bulk([TEST_PLAN_KEYS.plan_id]))
+        self.assertEqual(results[0][0], TEST_PLAN_KEYS.plan_id)
+        self.assertEqual(results[0][1].data.id, TEST_PLAN_KEYS.plan_id)
+
+    def test_errors(self):
+        client = ContractingClient('', host_url=HOST_URL, api_version=API_VERSION)
+        ids = [TEST_CONTRACT_KEYS.contract_id, TEST_CONTRACT_KEYS.error_id]
+        results = list(client.get_contracts_bulk(ids))
+        self.assertEqual(sorted(contract_id for contract_id, _ in results), sorted(ids))
+        for _, error in results:
+            self.assertIsInstance(error, ResourceNotFound)
+
+
+class ChangeTrackerTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        with open(ROOT + 'tenders.json') as tenders:
+            self.tenders = munchify(load(tenders)['data'])
+        self.tracker = ChangeTracker(merge_threshold=5)
+
+    def test_filter(self):
+        new = list(self.tracker.filter(self.tenders))
+        self.assertEqual(new, self.tenders)
+        self.assertEqual(len(self.tracker), len(set(t.id for t in self.tenders)))
+        self.assertEqual(list(self.tracker.filter(self.tenders)), [])
+        self.assertEqual(list(self.tracker.filter(reversed(self.tenders))), [])
+
+    def test_is_newer(self):
+        tender = self.tenders[0]
+        self.assertTrue(self.tracker.is_newer(tender))
+        self.tracker.update(tender)
+        self.assertIn(tender.id, self.tracker)
+        self.assertFalse(self.tracker.is_newer(tender))
+        newer = munchify({'id': tender.id, 'dateModified': '2016-01-01T00:00:00+02:00'})
+        self.assertTrue(self.tracker.is_newer(newer))
+        self.tracker.update(newer)
+        self.tracker.update(tender)
+        self.assertFalse(self.tracker.is_newer(newer))
+
+    def test_filter_without_record(self):
+        self.assertEqual(len(list(self.tracker.filter(self.tenders, record=False))),
+                         len(self.tenders))
+        self.assertEqual(len(self.tracker), 0)
+
+    def test_save_load(self):
+        for tender in self.tenders[:-1]:
+            self.tracker.update(tender)
+        path = mktemp()
+        try:
+            self.tracker.save(path)
+            tracker = ChangeTracker(path)
+            self.assertEqual(len(tracker), len(self.tracker))
+            self.assertEqual(list(tracker.filter(self.tenders)), self.tenders[-1:])
+        finally:
+            os.remove(path)
+
+
+class TenderIDIndexTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tenders_feed"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        with open(ROOT + 'tenders.json') as tenders:
+            self.tenders = load(tenders)['data']
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_update(self):
+        index = TenderIDIndex()
+        self.assertEqual(index.update(self.client, {'limit': 10}), len(self.tenders))
+        self.assertEqual(len(index), len(set(t['id'] for t in self.tenders)))
+        for tender in self.tenders:
+            self.assertEqual(index.get(tender_uaid(tender)), tender['id'])
+        self.assertIsNone(index.get('UA-0000-00-00-000000'))
+        self.assertEqual(index.update(self.client, {'limit': 10}), 0)
+
+    def test_persistence(self):
+        path = os.path.join(self.tmp_dir, 'index')
+        index = TenderIDIndex(path)
+        index.update(self.client, {'limit': 10})
+        index.close()
+        index = TenderIDIndex(path)
+        tender = self.tenders[0]
+        self.assertEqual(index.get(tender_uaid(tender)), tender['id'])
+        self.assertEqual(index.update(self.client, {'limit': 10}), 0)
+        index.close()
+
+    def test_add(self):
+        index = TenderIDIndex()
+        index.add([munchify({'id': TEST_KEYS.tender_id, 'tenderID': u'UA-2015-11-13-000001'}),
+                   munchify({'id': TEST_KEYS.empty_tender})])
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.get(u'UA-2015-11-13-000001'), TEST_KEYS.tender_id)
+
+
+class BackfillTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tenders_feed"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        with open(ROOT + 'tenders.json') as tenders:
+            self.tenders = load(tenders)['data']
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_split_windows(self):
+        windows = split_windows('2015-11-01T00:00:00+02:00', '2015-11-04T00:00:00+02:00', 3)
+        self.assertEqual(windows, [
+            ('2015-11-01T00:00:00+02:00', '2015-11-02T00:00:00+02:00'),
+            ('2015-11-02T00:00:00+02:00', '2015-11-03T00:00:00+02:00'),
+            ('2015-11-03T00:00:00+02:00', '2015-11-04T00:00:00+02:00'),
+        ])
+
+    def test_crawl_and_merge(self):
+        windows = split_windows(self.tenders[0]['dateModified'], '2016-01-01T00:00:00+02:00', 4)
+        results = [crawl_window(self.client, window, {'limit': 5}) for window in windows]
+        self.assertEqual(sum(len(items) for items in results), len(self.tenders))
+        results.append([_crawl((tender_client.TendersClient,
+                                {'key': '', 'host_url': HOST_URL, 'api_version': API_VERSION},
+                                (self.tenders[0]['dateModified'], self.tenders[9]['dateModified']),
+                                {'limit': 5}))][0])
+        merged = merge_windows(results)
+        latest = {}
+        for tender in self.tenders:
+            latest[tender['id']] = tender['dateModified']
+        self.assertEqual([(i.id, i.dateModified) for i in merged],
+                         sorted(latest.items(), key=lambda i: i[1]))
+        self.assertNotIn('offset', self.client.params)
+
+    def test_sharded_backfill(self):
+        # multiprocessing needs an interpreter gevent did not patch.
+        setup_routing(self.app, routs=["tender"])
+        script = (
+            "import sys\n"
+            "from openprocurement_client.backfill import sharded_backfill\n"
+            "from openprocurement_client.client import TendersClient\n"
+            "kwargs = dict(key='', host_url=sys.argv[1], api_version=sys.argv[2])\n"
+            "TendersClient(**kwargs).get_tender(sys.argv[3])\n"
+            "items = sharded_backfill(sys.argv[4], sys.argv[5], processes=4,\n"
+            "                         params={'limit': 2}, **kwargs)\n"
+            "print(len(items))\n")
+        process = Popen([sys.executable, '-c', script, HOST_URL, API_VERSION, TEST_KEYS.tender_id,
+                         self.tenders[0]['dateModified'], '2016-01-01T00:00:00+02:00'],
+                        stdout=PIPE, close_fds=True,
+                        cwd=os.path.dirname(os.path.dirname(os.path.abspath(tender_client.__file__))))
+        try:
+            with Timeout(20):
+                output, _ = process.communicate()
+        finally:
+            if process.poll() is None:
+                process.kill()
+        self.assertEqual(process.returncode, 0)
+        self.assertEqual(int(output), len(set(tender['id'] for tender in self.tenders)))
+
+    def test_client_params(self):
+        queries = []
+        self.app.add_hook('before_request', lambda: queries.append(dict(request.query)))
+        self.client.params['opt_fields'] = 'status'
+        window = (self.tenders[0]['dateModified'], self.tenders[3]['dateModified'])
+        items = crawl_window(self.client, window, {'limit': 5})
+        self.assertEqual(queries[0]['mode'], '_all_')
+        self.assertEqual(queries[0]['opt_fields'], 'status')
+        self.assertEqual(queries[0]['feed'], 'dateModified')
+        self.assertLess(queries[0]['offset'], window[0])
+        self.assertEqual([item.id for item in items], [tender['id'] for tender in self.tenders[:3]])
+
+
+class PageStreamTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tenders"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        with open(ROOT + 'tenders.json') as tenders:
+            self.tenders = munchify(load(tenders))
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_page_stream(self):
+        page = {"next_page": {"offset": 12.5}, "data": [
+            {"id": u"\u0442\u0435\u043d\u0434\u0435\u0440", "value": {"amount": 1234567}},
+            [1, 2.25, None, True], 42, u"\u0442\u0435\u043a\u0441\u0442",
+            12345678901234, 0.1, -1.5e-07, 2.5E+20], "total": 1000}
+        for chunk_size in range(1, 40) + [1024]:
+            stream = PageStream(StringIO(dumps(page, ensure_ascii=False).encode('utf-8')),
+                                chunk_size=chunk_size)
+            self.assertEqual(list(stream), page['data'])
+            self.assertEqual(stream.fields, {"next_page": {"offset": 12.5}, "total": 1000})
+
+    def test_empty_page(self):
+        stream = PageStream(StringIO('{"data": [], "next_page": {"offset": "x"}}'), chunk_size=4)
+        self.assertEqual(list(stream), [])
+        self.assertEqual(stream.fields['next_page'], {"offset": "x"})
+        self.assertEqual(list(PageStream(StringIO(' { } '))), [])
+
+    def test_malformed_page(self):
+        for body in ('{"data": [1, 2', '{"data": [1 2]}', '["data"]', '{"data": [{"id": }]}'):
+            with self.assertRaises(ValueError):
+                list(PageStream(StringIO(body), chunk_size=4))
+
+    def test_get_tenders_stream(self):
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        items = client.get_tenders(stream=True)
+        self.assertNotIn('offset', client.params)
+        self.assertEqual(list(items), self.tenders.data)
+        self.assertEqual(client.params['offset'], self.tenders.next_page.offset)
+
+
+class LazyMunchTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        with open(ROOT + TEST_KEYS.tender_id + '.json') as tender:
+            self.raw = tender.read()
+        self.tender = lazy_munchify(loads(self.raw))
+
+    def test_equal_to_munchify(self):
+        self.assertIsInstance(self.tender, LazyMunch)
+        self.assertEqual(self.tender, munchify(loads(self.raw)))
+        self.assertEqual(self.tender.toDict(), loads(self.raw))
+
+    def test_attribute_access(self):
+        self.assertEqual(self.tender.data.id, TEST_KEYS.tender_id)
+        self.assertIsInstance(self.tender.data, LazyMunch)
+        self.assertIsInstance(self.tender.data.bids, LazyList)
+        self.assertEqual(self.tender.data.bids[0].id, self.tender['data']['bids'][0]['id'])
+        self.assertIs(self.tender.data.bids[0], self.tender.data.bids[0])
+        self.assertEqual(getattr(getattr(self.tender, 'access', ''), 'token', ''), '')
+        self.assertRaises(AttributeError, getattr, self.tender.data, 'no_such_field')
+
+    def test_wrap_on_iteration(self):
+        for lot in self.tender.data.lots:
+            self.assertIsInstance(lot, LazyMunch)
+        for lot in reversed(self.tender.data.lots):
+            self.assertIsInstance(lot, LazyMunch)
+        for lot in self.tender.data.lots[:1]:
+            self.assertIsInstance(lot, LazyMunch)
+        for key, value in self.tender.data.items():
+            if isinstance(value, dict):
+                self.assertIsInstance(value, LazyMunch)
+        self.assertIsInstance(self.tender.data.get('value'), LazyMunch)
+        self.assertIsInstance(self.tender.data.pop('value'), LazyMunch)
+
+    def test_modification(self):
+        self.tender.data.description = 'test'
+        self.tender.data.lots[0].title = 'lot'
+        self.assertEqual(loads(dumps(self.tender))['data']['description'], 'test')
+        self.assertEqual(loads(dumps(self.tender))['data']['lots'][0]['title'], 'lot')
+
+
+class CodecTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        with open(ROOT + TEST_KEYS.tender_id + '.json') as tender:
+            self.raw = tender.read()
+
+    def test_get_codec(self):
+        self.assertIs(get_codec(), available_codecs()[0])
+        self.assertEqual(get_codec('simplejson').name, 'simplejson')
+        self.assertRaises(ValueError, get_codec, 'xml')
+
+    def test_roundtrip(self):
+        for codec in available_codecs():
+            tender = codec.loads(self.raw)
+            self.assertEqual(tender, loads(self.raw))
+            self.assertEqual(codec.loads(codec.dumps(lazy_munchify(tender))), tender)
+
+    def test_client_codec(self):
+        app = Bottle()
+        setup_routing(app, routs=["spore", "tender", "tender_create"])
+        server = WSGIServer(('localhost', 20602), app, log=None)
+        server.start()
+        try:
+            client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                                 codec=get_codec('json'))
+            self.assertEqual(client.codec.name, 'json')
+            tender = client.get_tender(TEST_KEYS.tender_id)
+            self.assertEqual(tender, munchify(loads(self.raw)))
+            self.assertEqual(client.create_tender(tender), tender)
+        finally:
+            server.stop()
+
+
+class ResponseFormatTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        with open(ROOT + TEST_KEYS.tender_id + '.json') as tender:
+            self.tender = load(tender)
+        with open(ROOT + 'tenders.json') as tenders:
+            self.tenders = load(tenders)
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def _client(self, response_format):
+        return tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                           response_format=response_format)
+
+    def test_dict(self):
+        setup_routing(self.app, routs=["tender", "tenders", "tender_patch"])
+        client = self._client('dict')
+        tender = client.get_tender(TEST_KEYS.tender_id)
+        self.assertIs(type(tender), dict)
+        self.assertEqual(tender, self.tender)
+        patched = client.patch_tender(munchify(self.tender))
+        self.assertIs(type(patched), dict)
+        tenders = client.get_tenders()
+        self.assertIs(type(tenders[0]), dict)
+        self.assertEqual(tenders, self.tenders['data'])
+        self.assertEqual(client.params['offset'], self.tenders['next_page']['offset'])
+
+    def test_raw(self):
+        setup_routing(self.app, routs=["tender", "tenders"])
+        client = self._client('raw')
+        tender = client.get_tender(TEST_KEYS.tender_id)
+        self.assertIsInstance(tender, str)
+        self.assertEqual(loads(tender), self.tender)
+        self.assertEqual(client.get_tenders(), self.tenders['data'])
+
+    def test_feed_helpers(self):
+        setup_routing(self.app, routs=["tenders_feed"])
+        pages = list(iter_pages(self._client('raw'), params={'limit': 10}))
+        self.assertEqual([i['id'] for page in pages for i in page['data']],
+                         [i['id'] for i in self.tenders['data']])
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, self._client, 'xml')
+
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tender", "plan"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+
+    def tearDown(self):
+        set_default_pool(None)
+        self.server.stop()
+        release_connections()
+
+    def test_shared_pool(self):
+        pool = ConnectionPool(max_size=5, reap_connections=False)
+        tenders = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                              pool=pool)
+        plans = plan_client.PlansClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                        pool=pool)
+        before = pool.stats()
+        for _ in range(3):
+            tenders.get_tender(TEST_KEYS.tender_id)
+            plans.get_plan(TEST_PLAN_KEYS.plan_id)
+        stats = pool.stats()
+        self.assertEqual(stats['new_connections'] - before['new_connections'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 5)
+        self.assertEqual(stats['idle'], 1)
+        pool.release_all()
+        self.assertEqual(pool.stats()['evictions'], 1)
+
+    def test_default_pool(self):
+        pool = set_default_pool(ConnectionPool(reap_connections=False))
+        self.assertIs(get_default_pool(), pool)
+        client = plan_client.PlansClient('', host_url=HOST_URL, api_version=API_VERSION)
+        self.assertIs(client.client._pool, pool)
+        client.get_plan(TEST_PLAN_KEYS.plan_id)
+        self.assertEqual(pool.stats()['new_connections'], 1)
+
+    def test_max_connections(self):
+        active = []
+        peak = []
+
+        def slow_request():
+            active.append(1)
+            peak.append(len(active))
+            sleep(0.02)
+            active.pop()
+        self.app.add_hook('before_request', slow_request)
+        pool = ConnectionPool(max_connections=2, reap_connections=False)
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                             pool=pool)
+        jobs = [spawn(client.get_tender, TEST_KEYS.tender_id) for _ in range(6)]
+        joinall(jobs, raise_error=True)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(pool.stats()['in_use'], 0)
+        self.assertRaises(ResourceNotFound, client.get_tender, 'missing/tender')
+        self.assertEqual(pool.stats()['in_use'], 0)
+
+    def test_max_idle(self):
+        pool = ConnectionPool(max_idle=0.01, reap_connections=False)
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                             pool=pool)
+        client.get_tender(TEST_KEYS.tender_id)
+        before = pool.stats()
+        sleep(0.05)
+        client.get_tender(TEST_KEYS.tender_id)
+        stats = pool.stats()
+        self.assertEqual(stats['new_connections'] - before['new_connections'], 1)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], before['hits'])
+
+
+
+class PathsTestCase(unittest.TestCase):
+    """"""
+    def test_paths(self):
+        prefix = api_path('2.0', 'tenders')
+        self.assertEqual(prefix, '/api/2.0/tenders')
+        self.assertEqual(api_path('2.0'), '/api/2.0')
+        self.assertEqual(item_path(prefix, 'abc', 'bids', 'def'), '/api/2.0/tenders/abc/bids/def')
+        self.assertEqual(item_path(prefix, 'abc', 'lots', 1), '/api/2.0/tenders/abc/lots/1')
+        self.assertEqual(latest_params('2016-01-02T03:04:05.123+02:00', 'tender_id'),
+                         {'offset': '2016-01-02T03:04:05', 'opt_fields': 'tender_id', 'mode': 'test'})
+
+    def test_access_headers(self):
+        tender = munchify({'data': {'id': 'abc'}, 'access': {'token': 'secret'}})
+        self.assertEqual(access_headers(tender), {'X-Access-Token': 'secret'})
+        self.assertEqual(access_headers(tender, 'other'), {'X-Access-Token': 'other'})
+        self.assertEqual(access_headers(munchify({'data': {}})), {'X-Access-Token': ''})
+
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tender", "tender_subpage"])
+        self.statuses = []
+        self.app.add_hook('after_request', lambda: self.statuses.append(response.status_code))
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.cache = ResponseCache()
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                                  cache=self.cache)
+        self.statuses[:] = []
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_revalidate(self):
+        tender = self.client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(len(self.cache), 1)
+        tender.data.title = 'changed locally'
+        again = self.client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(self.statuses, [200, 304])
+        self.assertEqual(self.cache.revalidated, 1)
+        self.assertEqual(again, munchify(tender_partition(TEST_KEYS.tender_id)))
+
+    def test_subresource_list(self):
+        tender = munchify({'data': {'id': TEST_KEYS.tender_id}})
+        questions = self.client.get_questions(tender)
+        self.assertEqual(self.client.get_questions(tender), questions)
+        self.assertEqual(self.statuses, [200, 304])
+
+    def test_changed(self):
+        self.client.get_tender(TEST_KEYS.tender_id)
+        key = self.cache.entries.keys()[0]
+        self.cache.entries[key].etag = '"stale"'
+        tender = self.client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(self.statuses, [200, 200])
+        self.assertEqual(tender, munchify(tender_partition(TEST_KEYS.tender_id)))
+        self.assertNotEqual(self.cache.entries[key].etag, '"stale"')
+
+    def test_raw_format(self):
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                             cache=self.cache, response_format='raw')
+        body = client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(client.get_tender(TEST_KEYS.tender_id), body)
+        self.assertEqual(self.statuses[-1], 304)
+
+    def test_ttl(self):
+        self.cache.ttl = 60
+        tender = munchify({'data': {'id': TEST_KEYS.tender_id}})
+        for _ in range(3):
+            self.client.get_tender(TEST_KEYS.tender_id)
+            self.client.get_questions(tender)
+        self.assertEqual(self.statuses, [200, 200])
+        self.assertEqual(self.cache.stats()['hits'], 4)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+        for entry in self.cache.entries.values():
+            entry.expires = 0
+        self.client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(self.statuses[-1], 304)
+        self.client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(len(self.statuses), 3)
+
+    def test_write_invalidates(self):
+        setup_routing(self.app, routs=["tender_patch", "tender_subpage_item_create"])
+        self.cache.ttl = 60
+        tender = self.client.get_tender(TEST_KEYS.tender_id)
+        self.client.get_questions(tender)
+        self.client.get_tender(TEST_KEYS_LIMITED.tender_id)
+        self.assertEqual(len(self.cache), 3)
+        self.client.create_question(tender, munchify({'data': {'title': 'q'}}))
+        self.assertEqual([key[0].split('/')[-1] for key in self.cache.entries],
+                         [TEST_KEYS_LIMITED.tender_id])
+        tender = self.client.get_tender(TEST_KEYS.tender_id)
+        self.client.patch_tender(tender)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_lru(self):
+        self.cache.max_size = 2
+        for tender_id in (TEST_KEYS.tender_id, TEST_KEYS_LIMITED.tender_id, TEST_KEYS.tender_id,
+                          TEST_KEYS.empty_tender):
+            self.client.get_tender(tender_id)
+        self.assertEqual([key[0].split('/')[-1] for key in self.cache.entries],
+                         [TEST_KEYS.tender_id, TEST_KEYS.empty_tender])
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_max_bytes(self):
+        self.cache.max_bytes = 10
+        self.client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(self.cache.stats()['bytes'], 0)
+        self.cache.max_bytes = 10 ** 6
+        self.client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(self.cache.stats()['bytes'],
+                         len(dumps(tender_partition(TEST_KEYS.tender_id))))
+
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tender"])
+        self.requests = []
+        self.app.add_hook('before_request', lambda: (self.requests.append(1), sleep(0.05)))
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                                  single_flight=True)
+        self.requests[:] = []
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_coalesce(self):
+        jobs = [spawn(self.client.get_tender, TEST_KEYS.tender_id) for _ in range(5)]
+        joinall(jobs, raise_error=True)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(jobs[0].value, munchify(tender_partition(TEST_KEYS.tender_id)))
+        for job in jobs[1:]:
+            self.assertIs(job.value, jobs[0].value)
+        self.assertEqual(self.client._in_flight, {})
+        self.client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(len(self.requests), 2)
+
+    def test_different_urls(self):
+        jobs = [spawn(self.client.get_tender, tender_id)
+                for tender_id in (TEST_KEYS.tender_id, TEST_KEYS_LIMITED.tender_id)]
+        joinall(jobs, raise_error=True)
+        self.assertEqual(len(self.requests), 2)
+
+    def test_shared_error(self):
+        def get_tender():
+            try:
+                self.client.get_tender('missing/tender')
+            except Exception as e:
+                return e
+        jobs = [spawn(get_tender) for _ in range(3)]
+        joinall(jobs)
+        self.assertEqual(len(self.requests), 1)
+        for job in jobs:
+            self.assertIsInstance(job.value, ResourceNotFound)
+
+    def test_leader_timeout(self):
+        def leader():
+            with Timeout(0.02, False):
+                self.client.get_tender(TEST_KEYS.tender_id)
+        jobs = [spawn(leader), spawn(self.client.get_tender, TEST_KEYS.tender_id)]
+        joinall(jobs, timeout=2, raise_error=True)
+        self.assertTrue(jobs[1].ready())
+        self.assertEqual(jobs[1].value, munchify(tender_partition(TEST_KEYS.tender_id)))
+        self.assertEqual(self.client._in_flight, {})
+
+
+class MultipartBodyTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tender_document_create"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.client = tender_client.TendersClient(API_KEY, host_url=HOST_URL, api_version=API_VERSION)
+        self.tender = munchify({'data': {'id': TEST_KEYS.tender_id}, 'access': {'token': API_KEY}})
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_read(self):
+        file_ = StringIO('x' * 100)
+        file_.name = '/tmp/test_document.txt'
+        body = MultipartBody({'file': file_}, boundary='b')
+        chunks = []
+        chunk = body.read(30)
+        while chunk:
+            self.assertLessEqual(len(chunk), 30)
+            chunks.append(chunk)
+            chunk = body.read(30)
+        data = ''.join(chunks)
+        self.assertEqual(len(data), body.get_size())
+        self.assertIn('filename="test_document.txt"', data)
+        self.assertIn('Content-Length: 100\r\n\r\n' + 'x' * 100 + '\r\n--b--\r\n', data)
+        body.seek(0)
+        self.assertEqual(''.join(iter(lambda: body.read(10 ** 6), '')), data)
+
+    def test_upload_file(self):
+        path = mktemp(suffix='.bin')
+        data = os.urandom(1024 * 1024)
+        with open(path, 'wb') as file_:
+            file_.write(data)
+        progress = []
+        try:
+            doc = self.client.upload_document(path, self.tender,
+                                              progress=lambda sent, total: progress.append((sent, total)))
+        finally:
+            os.remove(path)
+        self.assertEqual(doc.data.title, os.path.basename(path))
+        self.assertEqual(doc.data.hash, 'md5:' + md5(data).hexdigest())
+        self.assertGreater(len(progress), 1)
+        self.assertEqual(progress[-1], (len(data), len(data)))
+
+
+
+class BatchUploadTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.client = tender_client.TendersClient(API_KEY, host_url=HOST_URL, api_version=API_VERSION,
+                                                  retry_policy=RetryPolicy(backoff=0.001))
+        self.tender = munchify({'data': {'id': TEST_KEYS.tender_id}, 'access': {'token': API_KEY}})
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def _files(self, *names):
+        files = []
+        for name in names:
+            file_ = StringIO('data of ' + name)
+            file_.name = name
+            files.append(file_)
+        return files
+
+    def test_upload_documents(self):
+        setup_routing(self.app, routs=["tender_document_create"])
+        names = ['doc{}.txt'.format(i) for i in range(8)]
+        docs = self.client.upload_documents(self.tender, self._files(*names), concurrency=3)
+        self.assertEqual([doc.data.title for doc in docs], names)
+
+    def test_retry_failed(self):
+        attempts = {}
+
+        def create_document(tender_id):
+            name = request.files.file.filename
+            attempts[name] = attempts.get(name, 0) + 1
+            if name == 'forbidden.txt':
+                response.status = 403
+            elif name == 'broken.txt':
+                response.status = 502
+            elif name == 'flaky.txt' and attempts[name] == 1:
+                response.status = 429
+            else:
+                response.status = 201
+            return dumps({"data": {"title": name}})
+        self.app.route(TENDERS_PATH + '/<tender_id>/documents', 'POST', create_document)
+        files = self._files('a.txt', 'flaky.txt', 'forbidden.txt', 'broken.txt')
+        results = self.client.upload_documents(self.tender, files, concurrency=2)
+        self.assertEqual(results[0].data.title, 'a.txt')
+        self.assertEqual(results[1].data.title, 'flaky.txt')
+        self.assertIsInstance(results[2], Unauthorized)
+        self.assertIsInstance(results[3], RequestFailed)
+        self.assertEqual(attempts, {'a.txt': 1, 'flaky.txt': 2, 'forbidden.txt': 1, 'broken.txt': 1})
+
+    def test_one_retry_policy(self):
+        attempts = []
+
+        def create_document(tender_id):
+            attempts.append(request.files.file.filename)
+            response.status = 429
+            return dumps({"errors": []})
+        self.app.route(TENDERS_PATH + '/<tender_id>/documents', 'POST', create_document)
+        results = self.client.upload_documents(self.tender, self._files('busy.txt'))
+        self.assertIsInstance(results[0], RequestFailed)
+        self.assertEqual(len(attempts), self.client.retry_policy.max_attempts)
+
+    def test_local_errors_not_resent(self):
+        setup_routing(self.app, routs=["tender_document_create"])
+        calls = []
+
+        def upload(file_):
+            calls.append(file_)
+            raise IOError('disk error')
+        results = self.client._upload_files(upload, self._files('a.txt'))
+        self.assertIsInstance(results[0], IOError)
+        self.assertEqual(len(calls), 1)
+
+    def test_upload_bid_documents(self):
+        setup_routing(self.app, routs=["tender_subpage_document_create"])
+        docs = self.client.upload_bid_documents(self.tender, TEST_KEYS.bid_id,
+                                                self._files('one.txt', 'two.txt'))
+        self.assertEqual([doc.data.title for doc in docs], ['one.txt', 'two.txt'])
+
+
+
+class SessionTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tender", "tender_create"])
+        self.requests = []
+        self.app.add_hook('before_request', lambda: self.requests.append(
+            (request.method, request.headers.get('Cookie'))))
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_no_request_on_init(self):
+        tender_client.TendersClient('', host_url='http://localhost:1', api_version=API_VERSION)
+        tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        self.assertEqual(self.requests, [])
+
+    def test_bootstrap_on_write(self):
+        jar = CookieJar()
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                             cookies=jar)
+        client.get_tender(TEST_KEYS.tender_id)
+        self.assertEqual(self.requests, [('GET', None)])
+        tender = munchify(tender_partition(TEST_KEYS.tender_id))
+        client.create_tender(tender)
+        self.assertEqual([method for method, _ in self.requests], ['GET', 'HEAD', 'POST'])
+        self.assertTrue(self.requests[-1][1].startswith('SERVER_ID='))
+        other = plan_client.PlansClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                        cookies=jar)
+        self.assertEqual(other.cookies.header(), self.requests[-1][1])
+        client.create_tender(tender)
+        self.assertEqual(len(self.requests), 4)
+
+    def test_bootstrap_failed(self):
+        failures = [500]
+
+        def spore():
+            if failures:
+                response.status = failures.pop()
+            else:
+                response.set_cookie('SERVER_ID', 'abc')
+        self.app.route(SPORE_PATH, 'HEAD', spore)
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        tender = munchify(tender_partition(TEST_KEYS.tender_id))
+        self.assertRaises(RequestFailed, client.create_tender, tender)
+        self.assertFalse(client.cookies.bootstrapped)
+        client.create_tender(tender)
+        self.assertEqual([method for method, _ in self.requests], ['HEAD', 'HEAD', 'POST'])
+        self.assertEqual(self.requests[-1][1], 'SERVER_ID=abc')
+
+    def test_file_jar(self):
+        path = os.path.join(self.tmp_dir, 'cookies')
+        jar = CookieJar(path)
+        jar.update('SERVER_ID=abc; Path=/')
+        self.assertEqual(jar.header(), 'SERVER_ID=abc')
+        other = CookieJar(path)
+        self.assertEqual(other.header(), 'SERVER_ID=abc')
+        other.update('SERVER_ID=def; Path=/')
+        os.utime(path, (0, 0))
+        self.assertEqual(jar.header(), 'SERVER_ID=def')
+        jar.clear()
+        self.assertEqual(CookieJar(path).header(), '')
+
+    def test_session_pool(self):
+        def assign_backend():
+            if not request.get_cookie('SERVER_ID'):
+                response.set_cookie('SERVER_ID', uuid4().hex)
+        self.app.add_hook('before_request', assign_backend)
+        sessions = SessionPool(4)
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                             cookies=sessions)
+        tender_ids = ['{:032x}'.format(n) for n in range(20)]
+        for tender_id in tender_ids:
+            client.get_tender(tender_id)
+        first = dict(zip(tender_ids, (cookie for _, cookie in self.requests)))
+        del self.requests[:]
+        for tender_id in tender_ids:
+            client.get_tender(tender_id)
+        second = dict(zip(tender_ids, (cookie for _, cookie in self.requests)))
+        for tender_id in tender_ids:
+            self.assertEqual(second[tender_id], sessions.jar(tender_id).header())
+            if first[tender_id]:
+                self.assertEqual(first[tender_id], second[tender_id])
+        self.assertEqual(len(set(second.values())),
+                         len(set(id(sessions.jar(tender_id)) for tender_id in tender_ids)))
+        self.assertGreater(len(set(second.values())), 1)
+
+    def test_session_pool_create(self):
+        def assign_backend():
+            if not request.get_cookie('SERVER_ID'):
+                response.set_cookie('SERVER_ID', uuid4().hex)
+        self.app.add_hook('before_request', assign_backend)
+        sessions = SessionPool(8)
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                             cookies=sessions)
+        tender = munchify(tender_partition(TEST_KEYS.tender_id))
+        for n in range(10):
+            tender.data.id = '{:032x}'.format(n)
+            client.create_tender(tender)
+            created = self.requests[-1][1]
+            client.get_tender(TEST_KEYS.tender_id)
+            self.app.route(TENDERS_PATH + '/' + tender.data.id, 'GET',
+                           lambda: dumps({"data": {}}))
+            client.get_tender(tender.data.id)
+            self.assertEqual(self.requests[-1], ('GET', created))
+        self.assertEqual(len(sessions.pins), 10)
+
+    def test_session_pool_bootstrap(self):
+        sessions = SessionPool(2)
+        client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                             cookies=sessions)
+        client.create_tender(munchify(tender_partition(TEST_KEYS.tender_id)))
+        self.assertEqual([method for method, _ in self.requests], ['HEAD', 'POST'])
+        self.assertEqual(sum(1 for jar in sessions.jars if jar.header()), 1)
+
+
+class UtilsTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore", "tenders_feed"])
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION)
+        with open(ROOT + 'tenders.json') as tenders:
+            self.tenders = sorted(load(tenders)['data'], key=lambda t: t['dateModified'])
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_tenders_feed(self):
+        tenders = list(islice(tenders_feed(self.client), 15))
+        self.assertEqual([t.id for t in tenders], [t['id'] for t in self.tenders[:15]])
+
+    def test_get_tender_id_by_uaid(self):
+        index = TenderIDIndex()
+        tender = self.tenders[3]
+        self.assertEqual(get_tender_id_by_uaid(tender_uaid(tender), self.client, index=index),
+                         tender['id'])
+        self.assertTrue(len(index))
+        self.server.stop()
+        release_connections()
+        self.assertEqual(get_tender_id_by_uaid(tender_uaid(tender), self.client, index=index),
+                         tender['id'])
+
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore"])
+        self.requests = []
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.policy = RetryPolicy(backoff=0.001)
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                                  retry_policy=self.policy)
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def _route(self, method, statuses, headers={}):
+        def handler(tender_id=None):
+            self.requests.append(request.method)
+            response.status = statuses.pop(0) if statuses else (201 if method == 'POST' else 200)
+            for name, value in headers.items():
+                response.set_header(name, value)
+            return dumps({"data": {"id": TEST_KEYS.tender_id}})
+        path = TENDERS_PATH if method == 'POST' else TENDERS_PATH + '/<tender_id>'
+        self.app.route(path, method, handler)
+
+    def test_retry_get(self):
+        self._route('GET', [503, 502], {'Retry-After': '0'})
+        self.assertEqual(self.client.get_tender(TEST_KEYS.tender_id).data.id, TEST_KEYS.tender_id)
+        self.assertEqual(len(self.requests), 3)
+
+    def test_give_up(self):
+        self._route('GET', [500] * 10)
+        self.assertRaises(RequestFailed, self.client.get_tender, TEST_KEYS.tender_id)
+        self.assertEqual(len(self.requests), self.policy.max_attempts)
+
+    def test_post_not_idempotent(self):
+        self._route('POST', [502, 429])
+        self.assertRaises(RequestFailed, self.client.create_tender, {"data": {}})
+        self.assertEqual(self.requests, ['POST'])
+        del self.requests[:]
+        self.assertEqual(self.client.create_tender({"data": {}}).data.id, TEST_KEYS.tender_id)
+        self.assertEqual(self.requests, ['POST', 'POST'])
+
+    def test_rules(self):
+        policy = RetryPolicy(max_attempts=3, backoff=1, max_backoff=4, deadline=10)
+        self.assertTrue(policy.retryable('GET', RequestTimeout()))
+        self.assertFalse(policy.retryable('POST', RequestTimeout()))
+        self.assertFalse(policy.retryable('GET', ResourceNotFound()))
+        self.assertTrue(policy.retryable('PATCH', RequestFailed(http_code=429)))
+        for attempt in range(1, 6):
+            self.assertLessEqual(policy.delay(attempt, RequestTimeout()), min(4, 2 ** (attempt - 1)))
+        self.assertIsNone(policy.next_delay('GET', RequestTimeout(), 3, time()))
+        self.assertIsNone(policy.next_delay('GET', RequestTimeout(), 1, time() - 11))
+        self.assertIsNotNone(policy.next_delay('GET', RequestTimeout(), 1, time()))
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore"])
+        self.requests = []
+        self.statuses = []
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.breakers = CircuitBreakers(window=4, min_calls=4, reset_timeout=0.1)
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                                  retry_policy=RetryPolicy(max_attempts=1),
+                                                  breakers=self.breakers)
+
+        def handler(tender_id):
+            self.requests.append(tender_id)
+            response.status = self.statuses.pop(0) if self.statuses else 200
+            return dumps({"data": {"id": tender_id}})
+        self.app.route(TENDERS_PATH + '/<tender_id>', 'GET', handler)
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_trip_and_recover(self):
+        self.statuses = [500] * 4
+        for _ in range(4):
+            self.assertRaises(RequestFailed, self.client.get_tender, TEST_KEYS.tender_id)
+        self.assertEqual(self.breakers.get('tenders').state, OPEN)
+        self.assertRaises(CircuitOpen, self.client.get_tender, TEST_KEYS.tender_id)
+        self.assertEqual(len(self.requests), 4)
+        sleep(0.15)
+        self.assertEqual(self.client.get_tender(TEST_KEYS.tender_id).data.id, TEST_KEYS.tender_id)
+        self.assertEqual(self.breakers.get('tenders').state, CLOSED)
+
+    def test_failed_probe(self):
+        self.statuses = [503] * 5
+        for _ in range(4):
+            self.assertRaises(RequestFailed, self.client.get_tender, TEST_KEYS.tender_id)
+        sleep(0.15)
+        self.assertRaises(RequestFailed, self.client.get_tender, TEST_KEYS.tender_id)
+        self.assertEqual(self.breakers.get('tenders').state, OPEN)
+        self.assertRaises(CircuitOpen, self.client.get_tender, TEST_KEYS.tender_id)
+        self.assertEqual(len(self.requests), 5)
+
+    def test_client_errors(self):
+        self.statuses = [404] * 4
+        for _ in range(4):
+            self.assertRaises(ResourceNotFound, self.client.get_tender, TEST_KEYS.tender_id)
+        self.assertEqual(self.breakers.get('tenders').state, CLOSED)
+
+    def test_slow_calls(self):
+        breakers = CircuitBreakers(min_calls=2, slow_call=0.005, reset_timeout=60)
+        breaker = breakers.get('documents')
+        breakers.call('documents', sleep, 0.01)
+        breakers.call('documents', sleep, 0.01)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertRaises(CircuitOpen, breakers.call, 'documents', lambda: None)
+        self.assertEqual(breakers.get('tenders').state, CLOSED)
+        breaker.opened_at -= 60
+        breaker.before_call()
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertRaises(CircuitOpen, breaker.before_call)
+
+    def test_interrupted_probe(self):
+        breakers = CircuitBreakers(min_calls=1, reset_timeout=0.05)
+        self.assertRaises(ValueError, breakers.call, 'tenders', int, 'x')
+        breaker = breakers.get('tenders')
+        self.assertEqual(breaker.state, OPEN)
+        sleep(0.1)
+        with Timeout(0.01, False):
+            breakers.call('tenders', sleep, 1)
+        self.assertEqual(breaker.state, OPEN)
+        sleep(0.1)
+        self.assertEqual(breakers.call('tenders', int, '1'), 1)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_families(self):
+        self.assertEqual(self.client._family(TENDERS_PATH + '/1'), 'tenders')
+        self.assertEqual(self.client._family(TENDERS_PATH + '/1/documents/2'), 'documents')
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    """"""
+    def setUp(self):
+        self.app = Bottle()
+        setup_routing(self.app, routs=["spore"])
+        self.statuses = []
+        self.server = WSGIServer(('localhost', 20602), self.app, log=None)
+        self.server.start()
+        self.limiter = RateLimiter(rate=1000, limits={'tenders': (500, 10)})
+        self.client = tender_client.TendersClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                                  retry_policy=RetryPolicy(backoff=0.001),
+                                                  rate_limiter=self.limiter)
+
+        def handler(tender_id):
+            response.status = self.statuses.pop(0) if self.statuses else 200
+            response.set_header('Retry-After', '0')
+            return dumps({"data": {"id": tender_id}})
+        self.app.route(TENDERS_PATH + '/<tender_id>', 'GET', handler)
+
+    def tearDown(self):
+        self.server.stop()
+        release_connections()
+
+    def test_bucket(self):
+        bucket = TokenBucket(1, burst=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 1, delta=0.1)
+        self.assertAlmostEqual(bucket.reserve(), 2, delta=0.1)
+
+    def test_throttle(self):
+        bucket = TokenBucket(10, recovery=0.2)
+        bucket.throttle()
+        self.assertAlmostEqual(bucket.factor(), 0.5, places=1)
+        bucket.throttle(retry_after=1)
+        self.assertAlmostEqual(bucket.factor(), 0.25, places=1)
+        self.assertGreater(bucket.reserve(), 1)
+        sleep(0.2)
+        self.assertEqual(bucket.factor(), 1)
+        for _ in range(10):
+            bucket.throttle()
+        self.assertAlmostEqual(bucket.factor(), bucket.min_factor, places=1)
+
+    def test_shared_file(self):
+        path = mktemp()
+        try:
+            # At 0.1/s a token takes 10s to come back, whatever the timing.
+            first, second = TokenBucket(0.1, burst=2, path=path), TokenBucket(0.1, burst=2, path=path)
+            self.assertEqual(first.reserve(), 0)
+            self.assertEqual(second.reserve(), 0)
+            self.assertGreater(first.reserve(), 0)
+            second.throttle()
+            self.assertLess(first.factor(), 1)
+        finally:
+            os.remove(path)
+
+    def test_client_throttled(self):
+        self.statuses = [429]
+        self.assertEqual(self.client.get_tender(TEST_KEYS.tender_id).data.id, TEST_KEYS.tender_id)
+        self.assertLess(self.limiter.bucket.factor(), 1)
+        self.assertLess(self.limiter.buckets['tenders'].factor(), 1)
+        plans = plan_client.PlansClient('', host_url=HOST_URL, api_version=API_VERSION,
+                                        rate_limiter=self.limiter)
+        self.assertEqual(self.limiter._buckets(plans._family(plans.prefix_path)),
+                         [self.limiter.bucket])
+
+    def test_family_budget(self):
+        limiter = RateLimiter(limits={'tenders': (20, 1)})
+        self.assertEqual(limiter.wait('tenders'), 0)
+        self.assertGreater(limiter.wait('tenders'), 0)
+        self.assertEqual(limiter.wait('plans'), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_left
+from calendar import timegm
+from hashlib import md5
+
+from iso8601 import parse_date
+
+KEY_SIZE = 16
+HEADER = struct.Struct('<8sQ')
+MAGIC = 'OPCTRK01'
+# The API always renders dateModified like 2015-11-13T18:50:00.753811+02:00,
+# parse that shape without iso8601's Decimal arithmetic.
+DATE_RE = re.compile(r'^(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)'
+                     r'(?:\.(\d{1,6}))?([+-])(\d\d):(\d\d)$')
+
+
+def _key(resource_id):
+    return md5(resource_id).digest()
+
+
+def _timestamp(date_modified):
+    match = DATE_RE.match(date_modified)
+    if match is None:
+        dt = parse_date(date_modified)
+        return float(timegm(dt.utctimetuple()) * 1000000 + dt.microsecond)
+    year, month, day, hour, minute, second, fraction, sign, tz_hour, tz_minute = \
+        match.groups()
+    seconds = timegm((int(year), int(month), int(day),
+                      int(hour), int(minute), int(second)))
+    tz_offset = int(tz_hour) * 3600 + int(tz_minute) * 60
+    seconds = seconds - tz_offset if sign == '+' else seconds + tz_offset
+    return float(seconds * 1000000 + int((fraction or '0').ljust(6, '0')))
+
+
+class _SortedKeys(object):
+    """Sequence view over the packed keys, so bisect can search them"""
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys) // KEY_SIZE
+
+    def __getitem__(self, index):
+        return bytes(self.keys[index * KEY_SIZE:(index + 1) * KEY_SIZE])
+
+
+class ChangeTracker(object):
+    """Last seen dateModified per resource id, kept compact.
+
+    Ids are stored as their 16 byte md5 digest in one sorted bytearray
+    and timestamps as microseconds in a parallel array of doubles, so an
+    entry costs 24 bytes. Fresh updates go to a small dict first and are
+    merged into the arrays once there are ``merge_threshold`` of them.
+    """
+
+    def __init__(self, path=None, merge_threshold=10000):
+        self.path = path
+        self.merge_threshold = merge_threshold
+        self._keys = bytearray()
+        self._dates = array('d')
+        self._recent = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        self._merge()
+        return len(self._dates)
+
+    def __contains__(self, resource_id):
+        return self._get(_key(resource_id)) is not None
+
+    def _find(self, key):
+        index = bisect_left(_SortedKeys(self._keys), key)
+        if index < len(self._dates) and \
+                self._keys[index * KEY_SIZE:(index + 1) * KEY_SIZE] == key:
+            return index
+        return None
+
+    def _get(self, key):
+        if key in self._recent:
+            return self._recent[key]
+        index = self._find(key)
+        if index is not None:
+            return self._dates[index]
+
+    def _merge(self):
+        if not self._recent:
+            return
+        new = []
+        for key, timestamp in self._recent.items():
+            index = self._find(key)
+            if index is None:
+                new.append((key, timestamp))
+            else:
+                self._dates[index] = timestamp
+        self._recent = {}
+        if not new:
+            return
+        new.sort()
+        view = _SortedKeys(self._keys)
+        keys = bytearray()
+        dates = array('d')
+        start = 0
+        for key, timestamp in new:
+            index = bisect_left(view, key, start)
+            keys += self._keys[start * KEY_SIZE:index * KEY_SIZE]
+            keys += key
+            dates.extend(self._dates[start:index])
+            dates.append(timestamp)
+            start = index
+        keys += self._keys[start * KEY_SIZE:]
+        dates.extend(self._dates[start:])
+        self._keys = keys
+        self._dates = dates
+
+    def _check(self, item):
+        key = _key(item['id'])
+        timestamp = _timestamp(item['dateModified'])
+        seen = self._get(key)
+        return key, timestamp, seen is None or timestamp > seen
+
+    def _record(self, key, timestamp):
+        self._recent[key] = timestamp
+        if len(self._recent) >= self.merge_threshold:
+            self._merge()
+
+    def is_newer(self, item):
+        """True if the feed item changed since it was last recorded"""
+        return self._check(item)[2]
+
+    def update(self, item):
+        """Record the item's dateModified unless a newer one is known"""
+        key, timestamp, newer = self._check(item)
+        if newer:
+            self._record(key, timestamp)
+
+    def filter(self, items, record=True):
+        """Yield only items newer than recorded, recording them if asked"""
+        for item in items:
+            key, timestamp, newer = self._check(item)
+            if newer:
+                if record:
+                    self._record(key, timestamp)
+                yield item
+
+    def save(self, path=None):
+        path = path or self.path
+        self._merge()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self._dates)))
+            f.write(self._keys)
+            self._dates.tofile(f)
+        os.rename(tmp_path, path)
+
+    def load(self, path=None):
+        path = path or self.path
+        with open(path, 'rb') as f:
+            magic, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError('{} is not a change tracker file'.format(path))
+            self._keys = bytearray(f.read(count * KEY_SIZE))
+            self._dates = array('d')
+            self._dates.fromfile(f, count)
+        self._recent = {}
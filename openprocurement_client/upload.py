@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import mimetypes
+import os
+from uuid import uuid4
+
+from gevent import sleep
+
+from restkit.util import url_quote
+
+CRLF = '\r\n'
+
+
+def _file_size(file_):
+    """Bytes left to read in file_ from its current position"""
+    position = file_.tell()
+    try:
+        return os.fstat(file_.fileno()).st_size - position
+    except (AttributeError, IOError, OSError, ValueError):
+        file_.seek(0, os.SEEK_END)
+        size = file_.tell() - position
+        file_.seek(position)
+        return size
+
+
+def _escape_filename(name):
+    if isinstance(name, unicode):
+        name = name.encode('utf-8')
+    return name.encode('string_escape').replace('"', '\\"')
+
+
+class MultipartBody(object):
+    """multipart/form-data body read from its files as it is sent.
+
+    restkit reads the whole of a file that is not a builtin ``file``
+    into memory before sending it. This body instead hands restkit the
+    form in small reads, so a file of any size costs one chunk of memory
+    and the sending greenlet yields between chunks. ``progress``, if
+    given, is called as ``progress(sent, total)`` after every chunk of
+    file data, with byte counts of the files alone.
+    """
+
+    def __init__(self, fields, boundary=None, progress=None):
+        self.boundary = boundary or uuid4().hex
+        self.progress = progress
+        self.total = 0
+        self._parts = []
+        for name, value in fields.items():
+            if hasattr(value, 'read'):
+                fname = getattr(value, 'name', None)
+                size = _file_size(value)
+                self.total += size
+                self._parts.append(self._header(name, size, fname))
+                self._parts.append((value, value.tell(), size))
+            else:
+                value = value.encode('utf-8') if isinstance(value, unicode) else str(value)
+                self._parts.append(self._header(name, len(value)))
+                self._parts.append(value)
+            self._parts.append(CRLF)
+        self._parts.append('--{}--{}'.format(self.boundary, CRLF))
+        self.seek(0)
+
+    def _header(self, name, size, fname=None):
+        disposition = 'form-data; name="{}"'.format(url_quote(name))
+        if fname is not None:
+            fname = os.path.basename(fname)
+            disposition += '; filename="{}"'.format(_escape_filename(fname))
+            filetype = ';'.join(filter(None, mimetypes.guess_type(fname)))
+        else:
+            filetype = None
+        return CRLF.join(('--{}'.format(self.boundary),
+                          'Content-Disposition: {}'.format(disposition),
+                          'Content-Type: {}'.format(filetype or 'text/plain; charset=utf-8'),
+                          'Content-Length: {}'.format(size),
+                          '', ''))
+
+    def get_size(self):
+        return sum(part[2] if isinstance(part, tuple) else len(part)
+                   for part in self._parts)
+
+    def seek(self, offset, whence=0):
+        """Rewind to the start, so restkit can resend the body on a retry"""
+        if offset or whence:
+            raise IOError('MultipartBody can only seek to the start')
+        self._index = 0
+        self._offset = 0
+        self.sent = 0
+        for part in self._parts:
+            if isinstance(part, tuple):
+                part[0].seek(part[1])
+
+    def read(self, size=16 * 1024):
+        while self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, tuple):
+                file_, start, length = part
+                chunk = file_.read(min(size, length - self._offset)) if self._offset < length else ''
+                if chunk:
+                    self._offset += len(chunk)
+                    self.sent += len(chunk)
+                    if self.progress is not None:
+                        self.progress(self.sent, self.total)
+                    sleep(0)
+                    return chunk
+            else:
+                chunk = part[self._offset:self._offset + size]
+                if chunk:
+                    self._offset += len(chunk)
+                    return chunk
+            self._index += 1
+            self._offset = 0
+        return ''
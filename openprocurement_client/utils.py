@@ -1,36 +1,54 @@
 # -*- coding: utf-8 -*-
 from openprocurement_client.client import Client
 from openprocurement_client.exceptions import IdNotFound
+from openprocurement_client.sync import AdaptivePoller
 from time import sleep
 import logging
 logger = logging.getLogger()
 
 
-def tenders_feed(client=Client(''), sleep_time=10):
+def tenders_feed(client=None, sleep_time=10, poller=None, tracker=None):
+    if client is None:
+        client = Client('')
+    if poller is None:
+        poller = AdaptivePoller(max_interval=sleep_time,
+                                limit=int(client.params.get('limit', 100)))
     while True:
-        tender_list = True
-        while tender_list:
-            logger.info("Get next batch")
-            tender_list = client.get_tenders()
-            for tender in tender_list:
-                logger.debug("Return tender {}".format(str(tender)))
-                yield tender
-        logger.info("Wait to get next batch")
-        sleep(sleep_time)
+        logger.info("Get next batch")
+        tender_list = client.get_tenders()
+        tenders = tracker.filter(tender_list) if tracker else tender_list
+        for tender in tenders:
+            logger.debug("Return tender {}".format(str(tender)))
+            yield tender
+        if poller.update(tender_list):
+            logger.info("Wait {:.1f}s to get next batch, lag {:.1f}s".format(
+                poller.interval, poller.lag))
+            sleep(poller.interval)
 
 
-def get_tender_id_by_uaid(ua_id, client=Client(''), descending=True, id_field='tenderID'):
+def get_tender_id_by_uaid(ua_id, client=None, descending=True, id_field='tenderID',
+                          index=None):
+    if client is None:
+        client = Client('')
+    if index is not None:
+        tender_id = index.get(ua_id)
+        if tender_id:
+            return tender_id
     params = {'offset': '', 'opt_fields': id_field, 'descending': descending}
     tender_list = True
     client._update_params(params)
     while tender_list:
         tender_list = client.get_tenders()
+        if index is not None:
+            index.add(tender_list)
         for tender in tender_list:
             if tender[id_field] == ua_id:
                 return tender.id
     raise IdNotFound
 
 
-def get_tender_by_uaid(ua_id, client=Client('')):
-    tender_id = get_tender_id_by_uaid(ua_id, client)
+def get_tender_by_uaid(ua_id, client=None, index=None):
+    if client is None:
+        client = Client('')
+    tender_id = get_tender_id_by_uaid(ua_id, client, index=index)
     return client.get_tender(tender_id)
@@ -35,7 +35,6 @@ setup(
         'iso8601',
         'munch',
         'restkit',
-        'retrying',
         'simplejson'
         # -*- Extra requirements: -*-
     ],